@@ -1,22 +1,271 @@
+# -*- coding: utf-8 -*-
 import re
 import sys
+import copy
+import json
+import array
+import weakref
+import operator
+import threading
 
 try:
-    from collections.abc import MutableSequence, MutableSet  # python 3
+    from collections.abc import Mapping, MutableSequence, MutableSet  # python 3
 
 except ImportError:
-    from collections import MutableSequence, MutableSet  # py2
+    from collections import Mapping, MutableSequence, MutableSet  # py2
 
 from luckydonaldUtils import encoding
 from luckydonaldUtils.encoding import to_native as n
 import logging
 
-__all__ = ["DictObject", "DictObjectList"]
+__all__ = [
+    "DictObject", "DictObjectList", "LazyDictObject", "LazyDictObjectList", "FrozenDictObject", "FrozenDictObjectList",
+    "DictObjectRecord", "ColumnarDictObjectList", "DictObjectListIndex", "DictObjectPath",
+    "DictObjectSnapshot", "DictObjectListSnapshot",
+    "attribute_name_cache", "shared_attribute_maps",
+]
 __author__ = 'luckydonald'
 __version__ = '1.1.0'
 logger = logging.getLogger(__name__)
 
 unallowed_in_variable_name = re.compile('[\W]+')
+_NOT_FOUND = object()
+
+
+def _json_default(obj):
+    """
+    Serializes the values json can't, for DictObject.to_json().
+    Only called for those, DictObjects and DictObjectLists are dicts and lists already.
+    """
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    elif hasattr(obj, "as_dict"):
+        return obj.as_dict()
+    # end if
+    raise TypeError("Object of type {type} is not JSON serializable".format(type=type(obj).__name__))
+# end def
+
+
+class _BoundedCache(object):
+    """
+    A dict capped to `maxsize` entries, when full the oldest entry is dropped. It counts hits and misses.
+    The values must not be None, that's a miss.
+    """
+    def __init__(self, maxsize):
+        """
+        :param maxsize: How many keys to remember at most. `0` disables caching.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+    # end def
+
+    @staticmethod
+    def _cache_key(key):
+        return key
+    # end def
+
+    def get(self, key):
+        value = self._cache.get(self._cache_key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        # end if
+        return value
+    # end def
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        # end if
+        cache = self._cache
+        while len(cache) >= self.maxsize:
+            # The cache is shared by all threads. Another one may evict the same key, or change it while we iterate.
+            try:
+                cache.pop(next(iter(cache), None), None)
+            except RuntimeError:  # dictionary changed size during iteration
+                pass
+            # end try
+        # end while
+        cache[self._cache_key(key)] = value
+    # end def
+
+    def info(self):
+        """
+        :return: Statistics, a dict with the keys `hits`, `misses`, `maxsize` and `currsize`.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'maxsize': self.maxsize, 'currsize': len(self._cache)}
+    # end def
+
+    def clear(self):
+        """ Empties the cache and resets the statistics. """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+    # end def
+# end class
+
+
+class AttributeNameCache(_BoundedCache):
+    """
+    Remembers which attribute name DictObject.get_attribute_name_by_key() generated for a key,
+    so keys seen before don't need to run through the regex again.
+    It is capped to `maxsize` entries, when full the oldest entry is dropped.
+
+    There is one global instance, `attribute_name_cache`.
+
+        >>> cache = AttributeNameCache(maxsize=2)
+        >>> cache.get("foo-bar") is None
+        True
+        >>> cache.set("foo-bar", "foo_bar")
+        >>> cache.get("foo-bar")
+        'foo_bar'
+        >>> cache.set(1, "int_1")
+        >>> cache.set(True, "data_True")  # 1 == True, but they still get different names. Also drops "foo-bar".
+        >>> cache.get(1), cache.get(True), cache.get("foo-bar")
+        ('int_1', 'data_True', None)
+        >>> cache.info() == {'hits': 3, 'misses': 2, 'maxsize': 2, 'currsize': 2}
+        True
+        >>> cache.clear()
+        >>> cache.info() == {'hits': 0, 'misses': 0, 'maxsize': 2, 'currsize': 0}
+        True
+    """
+    def __init__(self, maxsize=10000):
+        """
+        :param maxsize: How many keys to remember at most. `0` disables caching.
+        """
+        super(AttributeNameCache, self).__init__(maxsize)
+    # end def
+
+    @staticmethod
+    def _cache_key(key):
+        # 1, 1.0 and True are equal dict keys, but result in different attribute names.
+        return key if type(key) is str else (type(key), key)
+    # end def
+# end class
+
+
+attribute_name_cache = AttributeNameCache()
+
+
+class _SharedAttributeMap(dict):
+    """
+    An attribute to key map, which is shared by several DictObjects.
+    Therefore it must not be changed, a DictObject has to copy it before adding or removing attributes.
+    """
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("This attribute map is shared, copy it before changing it.")
+    # end def
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+# end class
+
+
+_EMPTY_ATTRIBUTE_MAP = _SharedAttributeMap()
+
+
+class SharedAttributeMaps(object):
+    """
+    Lets DictObjects with the same keys share one attribute to key map (DictObject._attribute_to_key_map),
+    similar to the key-sharing dictionaries of CPython.
+    So a DictObjectList of a million records with the same keys only stores that mapping once.
+
+    Only string keys without attribute name collisions get shared, everything else keeps it's own map.
+    An object copies the shared map as soon as it gets an attribute (key) the shared one doesn't have.
+
+    There is one global instance, `shared_attribute_maps`.
+
+        >>> shared_attribute_maps.clear()
+        >>> records = DictObjectList([{"id": i, "user-name": "user {i}".format(i=i)} for i in range(3)])
+        >>> records[0]._attribute_to_key_map is records[1]._attribute_to_key_map is records[2]._attribute_to_key_map
+        True
+        >>> records[2].user_name
+        'user 2'
+        >>> shared_attribute_maps.info() == {'maps': 1, 'maxsize': 1000, 'max_keys': 256}
+        True
+
+        Updating a value doesn't change the keys, so the map stays shared:
+
+        >>> records[1].id = 42
+        >>> records[1]._attribute_to_key_map is records[0]._attribute_to_key_map
+        True
+
+        Adding a new one makes the object use it's own copy:
+
+        >>> records[2]["new key"] = True
+        >>> records[2].new_key
+        True
+        >>> records[2]._attribute_to_key_map is records[0]._attribute_to_key_map
+        False
+        >>> hasattr(records[0], "new_key")
+        False
+    """
+    def __init__(self, maxsize=1000, max_keys=256):
+        """
+        :param maxsize: How many different key sets to store at most. `0` disables sharing.
+        :param max_keys: Only share maps of objects with up to this many keys.
+        """
+        self.maxsize = maxsize
+        self.max_keys = max_keys
+        self._maps = {}
+    # end def
+
+    def get(self, d):
+        """
+        The shared map for a dict with exactly the keys (in that order) of `d`, or None if there is none.
+        """
+        if not self._maps or len(d) > self.max_keys:
+            return None
+        # end if
+        # Only maps with all keys being strings are stored,
+        # so a `(1,)` can't be confused with `(True,)`, even if they are equal.
+        return self._maps.get(tuple(d))
+    # end def
+
+    def share(self, obj):
+        """
+        Replaces the attribute map of the given DictObject with a shared one, if possible.
+        """
+        key_map = obj._attribute_to_key_map
+        length = len(key_map)
+        if type(key_map) is _SharedAttributeMap or length != dict.__len__(obj) or length > self.max_keys:
+            return
+        # end if
+        signature = tuple(dict.__iter__(obj))
+        shared = self._maps.get(signature)
+        if shared is None:
+            if length == 0 or len(self._maps) >= self.maxsize:
+                return
+            # end if
+            for attribute_name, key in key_map.items():
+                if type(key) is not str or DictObject.get_attribute_name_by_key(key) != attribute_name:
+                    return  # only store the normal mapping, not the numbered ones of colliding attribute names.
+                # end if
+            # end for
+            shared = self._maps[signature] = _SharedAttributeMap(key_map)
+        elif shared != key_map:
+            return
+        # end if
+        obj._attribute_to_key_map = shared
+    # end def
+
+    def info(self):
+        """
+        :return: Statistics, a dict with the keys `maps`, `maxsize` and `max_keys`.
+        """
+        return {'maps': len(self._maps), 'maxsize': self.maxsize, 'max_keys': self.max_keys}
+    # end def
+
+    def clear(self):
+        """ Forgets all the shared maps. Objects already using one keep it. """
+        self._maps.clear()
+    # end def
+# end class
+
+
+shared_attribute_maps = SharedAttributeMaps()
 
 
 def suppress_context(exc):
@@ -36,10 +285,133 @@ class SomeDict(dict):
 # end class
 
 
+def _set_observer(value, observer):
+    """
+    Sets the `_observer` of value, and of all the DictObjects, DictObjectLists and DictObjectSets in it.
+
+    An observer is a tuple `(weakref.ref(root), key)`. When an observed container is changed,
+    `root._nested_changed(key)` is called. AutosaveDictObject uses that to notice changes deep inside the data.
+    Each container has only one observer, the last one set wins. `None` removes it.
+
+        >>> import weakref
+        >>> class Root(object):
+        ...     def _nested_changed(self, key):
+        ...         print("changed: " + key)
+        >>> root = Root()
+        >>> data = DictObject.objectify({"a": [{"b": {1, 2}}]})
+        >>> _set_observer(data, (weakref.ref(root), "data"))
+        >>> data.a[0].b.add(3)
+        changed: data
+        >>> data.a.append({"c": 4})
+        changed: data
+        >>> data.a[1].c = 5
+        changed: data
+        >>> del data.a[0]
+        changed: data
+        >>> _set_observer(data, None)
+        >>> data.a.pop() == {"c": 5}
+        True
+    """
+    if isinstance(value, DictObject):
+        value._observer = observer
+        children = dict.values(value)  # not objectifying lazy values, they get it when they are objectified.
+    elif isinstance(value, DictObjectList):
+        value._observer = observer
+        children = list.__iter__(value)
+    elif isinstance(value, DictObjectSet):
+        value._observer = observer
+        children = set.__iter__(value)
+    elif isinstance(value, tuple):
+        children = value
+    else:
+        return
+    # end if
+    for child in children:
+        _set_observer(child, observer)
+    # end for
+# end def
+
+
+def _observed_change(container, value=None):
+    """
+    Called after an observed container changed.
+    Passes the observer on to the new value (if any), and notifies the root.
+    """
+    observer = container._observer
+    if value is not None:
+        _set_observer(value, observer)
+    # end if
+    root = observer[0]()
+    if root is not None:
+        root._nested_changed(observer[1])
+    # end if
+# end def
+
+
+class _Snapshots(object):
+    """
+    The global state of the snapshots, see DictObject.snapshot().
+
+    Every snapshot gets the current `epoch`, and increases it.
+    A DictObject, DictObjectList or DictObjectSet remembers in `_cow_epoch` in which epoch it was saved last.
+    Before it is changed in a later epoch, while a snapshot of that time still exists, a shallow copy of it is
+    appended to its `_cow_history` as `(epoch - 1, content)`. A snapshot of epoch `e` reads the first entry
+    with an epoch of at least `e`, or the live content if there is none (it wasn't changed since then).
+    """
+    def __init__(self):
+        self.epoch = 0  # 0: there never was a snapshot, so nothing has to be saved.
+        self.live = weakref.WeakValueDictionary()  # epoch: _SnapshotToken, of the snapshots still in use.
+        self.lock = threading.Lock()
+    # end def
+# end class
+
+
+_snapshots = _Snapshots()
+
+
+def _save_for_snapshots(node):
+    """
+    Called before changing a DictObject, DictObjectList or DictObjectSet in a new epoch.
+    Saves a copy of the content, if a snapshot still needs it. It must be saved before the change,
+    as a snapshot reads the live content first, and the history afterwards.
+    """
+    epoch = _snapshots.epoch
+    live = list(_snapshots.live.keys())
+    history = node._cow_history
+    if not live:
+        if history is not None:
+            node._cow_history = None
+        # end if
+        node._cow_epoch = epoch  # so the next changes don't end up here again.
+        return
+    # end if
+    if history is not None:
+        oldest = min(live)
+        history = [entry for entry in history if entry[0] >= oldest]  # no snapshot reads the older ones.
+    # end if
+    if max(live) >= node._cow_epoch:  # a snapshot was taken since the last save.
+        if isinstance(node, dict):
+            content = dict.copy(node)
+        elif isinstance(node, list):
+            content = list.__getitem__(node, slice(None))
+        else:
+            content = set.copy(node)
+        # end if
+        history = (history or []) + [(epoch - 1, content)]
+    # end if
+    node._cow_history = history or None  # a new list, so a reader never sees one which is changed.
+    node._cow_epoch = epoch
+# end def
+
+
 class SelfObjectifyMixin(object):
     """
     To provide the same functionality to both the list and the set implementations
     """
+    _observer = None  # See _set_observer()
+    _cow_epoch = 0  # See _Snapshots
+    _cow_history = None
+
     @staticmethod
     def iterator_objectified(iterable):
         """
@@ -77,6 +449,27 @@ class SelfObjectifyMixin(object):
             yield DictObject.objectify(i)
         # end for
     # end def
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_observer", None)  # weak references can't be pickled, and the copy isn't part of that tree anyway.
+        state.pop("_indexes", None)  # they belong to the original list, see DictObjectList.create_index().
+        state.pop("_cow_epoch", None)  # the snapshots are of the original, see DictObject.snapshot().
+        state.pop("_cow_history", None)
+        return state
+    # end def
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+    # end def
+
+    def __copy__(self):
+        return _copy_node(self)
+    # end def
+
+    def __deepcopy__(self, memo):
+        return _copy_node(self, memo)
+    # end def
 # end class
 
 
@@ -106,8 +499,13 @@ class DictObjectList(list, MutableSequence, SelfObjectifyMixin):
     True
     """
 
+    _indexes = None  # {fields: DictObjectListIndex}, see create_index()
+
     def __init__(self, iterable=None):
         super(DictObjectList, self).__init__(DictObjectList.iterator_objectified(iterable))
+        if _snapshots.epoch and _snapshots.live:
+            self._cow_epoch = _snapshots.epoch  # no snapshot can have seen it before.
+        # end if
     # end def __init__
 
     def insert(self, index, value):
@@ -125,19 +523,70 @@ class DictObjectList(list, MutableSequence, SelfObjectifyMixin):
         :return:
         """
         obj_value = DictObject.objectify(value)
-        return super(DictObjectList, self).insert(index, obj_value)
+        if self._indexes:
+            self._check_indexes((obj_value,))
+        # end if
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectList, self).insert(index, obj_value)
+        if self._indexes:
+            self._update_indexes(added=(obj_value,))
+        # end if
+        if self._observer is not None:
+            _observed_change(self, obj_value)
+        # end if
 
     def __iadd__(self, values):
         obj_values = DictObject.objectify(values)
-        return super(DictObjectList, self).__iadd__(obj_values)
+        if self._indexes:
+            obj_values = list(obj_values)
+            self._check_indexes(obj_values)
+        # end if
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        result = super(DictObjectList, self).__iadd__(obj_values)
+        if self._indexes:
+            self._update_indexes(added=obj_values)
+        # end if
+        if self._observer is not None:
+            _observed_change(self, obj_values)
+        # end if
+        return result
 
     def extend(self, values):
         obj_value = DictObject.objectify(values)
+        if self._indexes:
+            obj_value = list(obj_value)
+            self._check_indexes(obj_value)
+        # end if
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
         super(DictObjectList, self).extend(obj_value)
+        if self._indexes:
+            self._update_indexes(added=obj_value)
+        # end if
+        if self._observer is not None:
+            _observed_change(self, obj_value)
+        # end if
 
     def append(self, value):
         obj_value = DictObject.objectify(value)
+        if self._indexes:
+            self._check_indexes((obj_value,))
+        # end if
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
         super(DictObjectList, self).append(obj_value)
+        if self._indexes:
+            self._update_indexes(added=(obj_value,))
+        # end if
+        if self._observer is not None:
+            _observed_change(self, obj_value)
+        # end if
 
     def __setitem__(self, index, value):
         """
@@ -149,12 +598,406 @@ class DictObjectList(list, MutableSequence, SelfObjectifyMixin):
            >>> l
            [1, 'middle', 3]
 
-       :param index: Which item to replace
-       :param value: The value to set
-       :return:
-       """
-        obj_value = DictObject.objectify(value)
-        return super(DictObjectList, self).__setitem__(index, obj_value)
+       :param index: Which item to replace
+       :param value: The value to set
+       :return:
+       """
+        obj_value = DictObject.objectify(value)
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        if not self._indexes:
+            super(DictObjectList, self).__setitem__(index, obj_value)
+        elif isinstance(index, slice):
+            super(DictObjectList, self).__setitem__(index, obj_value)
+            self._invalidate_indexes()  # rows can be added and removed anywhere, a rebuild is simpler.
+        else:
+            old_value = list.__getitem__(self, index)
+            self._check_indexes((obj_value,), removed=(old_value,))
+            super(DictObjectList, self).__setitem__(index, obj_value)
+            self._update_indexes(added=(obj_value,), removed=(old_value,))
+        # end if
+        if self._observer is not None:
+            _observed_change(self, obj_value)
+        # end if
+    # end def
+
+    def __delitem__(self, index):
+        removed = list.__getitem__(self, index) if self._indexes else None
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectList, self).__delitem__(index)
+        if self._indexes:
+            self._update_indexes(removed=removed if isinstance(index, slice) else (removed,))
+        # end if
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def pop(self, *index):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        value = super(DictObjectList, self).pop(*index)
+        if self._indexes:
+            self._update_indexes(removed=(value,))
+        # end if
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+        return value
+    # end def
+
+    def remove(self, value):
+        self.__delitem__(list.index(self, value))
+    # end def
+
+    def clear(self):
+        self.__delitem__(slice(None))
+    # end def
+
+    def sort(self, *args, **kwargs):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectList, self).sort(*args, **kwargs)
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def reverse(self):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectList, self).reverse()
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def __imul__(self, n):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        result = super(DictObjectList, self).__imul__(n)
+        if self._indexes:
+            self._invalidate_indexes()
+        # end if
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+        return result
+    # end def
+
+    def create_index(self, fields, unique=False):
+        """
+        Creates an index of the records (dicts) in this list by the value of one or more keys,
+        so you can find them in O(1) with find() or by(), instead of checking every record.
+        It stays up to date when you change the list itself (append, insert, extend, +=, del, pop, ...).
+
+            >>> users = DictObjectList([{"id": 1, "name": "alice", "team": "a"}, {"id": 2, "name": "bob", "team": "b"}])
+            >>> _ = users.create_index("id", unique=True)
+            >>> users.find(id=2).name
+            'bob'
+            >>> users.append({"id": 3, "name": "carol", "team": "a"})
+            >>> users.by("id")[3].name
+            'carol'
+            >>> users.find(id=4) is None
+            True
+            >>> users.append({"id": 3, "name": "dave"})
+            Traceback (most recent call last):
+            ...
+            ValueError: Duplicate value 3 for the unique index on ('id',).
+            >>> len(users)
+            3
+
+        An index can be on several keys, then the lookup key is a tuple.
+        Without `unique`, every key has a list of all the matching records.
+
+            >>> team_names = users.create_index(["team", "name"])
+            >>> team_names[("a", "carol")][0].id
+            3
+            >>> _ = users.create_index("team")
+            >>> [user.name for user in users.find_all(team="a")]
+            ['alice', 'carol']
+            >>> del users[0]
+            >>> [user.name for user in users.find_all(team="a")]
+            ['carol']
+            >>> users.by("id").get(1) is None
+            True
+
+        The index can't see when you change a record itself, only when you change the list.
+        Call rebuild_indexes() after changing an indexed key of a record which is already in the list.
+
+            >>> users[0].id = 20
+            >>> users.rebuild_indexes()
+            >>> users.find(id=20).name
+            'bob'
+
+        Records which don't have all the keys (or which aren't dicts) are not in the index.
+        Indexes are not copied or pickled along with the list.
+
+        :param fields: The key, or a list of keys.
+        :param unique: If there can only be one record for every value. Default: False
+        :return: The DictObjectListIndex. If there already is one on those keys, that one.
+        """
+        fields = (fields,) if not isinstance(fields, (list, tuple)) else tuple(fields)
+        if self._indexes is None:
+            self._indexes = {}
+        # end if
+        index = self._indexes.get(fields)
+        if index is None or index.unique != unique:
+            index = DictObjectListIndex(self, fields, unique=unique)
+            index.rebuild()  # before storing it, so a failing unique index isn't kept.
+            self._indexes[fields] = index
+        # end if
+        return index
+    # end def
+
+    def drop_index(self, fields):
+        """
+        Removes the index on those keys, see create_index().
+
+        :param fields: The key, or a list of keys.
+        """
+        fields = (fields,) if not isinstance(fields, (list, tuple)) else tuple(fields)
+        if self._indexes:
+            self._indexes.pop(fields, None)
+        # end if
+    # end def
+
+    def by(self, fields):
+        """
+        Gets the index on the given keys, to look up records by their value.
+
+            >>> l = DictObjectList([{"id": 1}, {"id": 2}])
+            >>> l.by("id")
+            Traceback (most recent call last):
+            ...
+            KeyError: "No index on ('id',), use create_index() first."
+            >>> _ = l.create_index("id", unique=True)
+            >>> l.by("id")[2]
+            {'id': 2}
+
+        :param fields: The key, or a list of keys.
+        :return: The DictObjectListIndex.
+        """
+        fields = (fields,) if not isinstance(fields, (list, tuple)) else tuple(fields)
+        index = self._indexes.get(fields) if self._indexes else None
+        if index is None:
+            raise KeyError("No index on {fields!r}, use create_index() first.".format(fields=fields))
+        # end if
+        return index
+    # end def
+
+    def find_all(self, **conditions):
+        """
+        Gets all the records which have the given values, e.g. `l.find_all(team="a")`.
+        With an index on exactly those keys that is O(1), else every record is checked.
+
+            >>> l = DictObjectList([{"id": 1, "team": "a"}, {"id": 2, "team": "b"}, {"id": 3, "team": "a"}])
+            >>> [x.id for x in l.find_all(team="a")]
+            [1, 3]
+            >>> [x.id for x in l.find_all(team="a", id=3)]
+            [3]
+
+        :return: A list of the records, in the order they were added.
+        """
+        fields = tuple(sorted(conditions))
+        index = self._find_index(fields)
+        if index is not None:
+            rows = index.get(tuple(conditions[field] for field in index.fields) if len(fields) > 1 else conditions[fields[0]])
+            if rows is None:
+                return []
+            # end if
+            return [rows] if index.unique else list(rows)
+        # end if
+        return [
+            row for row in self if isinstance(row, dict) and
+            all(row.get(field, _NOT_FOUND) == value for field, value in conditions.items())
+        ]
+    # end def
+
+    def find(self, **conditions):
+        """
+        Gets the first record which has the given values, e.g. `users.find(id=uid)`, or None.
+        With an index on exactly those keys that is O(1), see create_index().
+
+            >>> DictObjectList([{"id": 1}, {"id": 2}]).find(id=2)
+            {'id': 2}
+
+        :return: The record, or None.
+        """
+        rows = self.find_all(**conditions)
+        return rows[0] if rows else None
+    # end def
+
+    def _find_index(self, fields):
+        if not self._indexes:
+            return None
+        # end if
+        index = self._indexes.get(fields)
+        if index is None:  # keys in a different order
+            for index in self._indexes.values():
+                if len(index.fields) == len(fields) and sorted(index.fields) == list(fields):
+                    return index
+                # end if
+            # end for
+            return None
+        # end if
+        return index
+    # end def
+
+    def rebuild_indexes(self):
+        """
+        Builds all the indexes again, e.g. after you changed an indexed key of a record in the list.
+        """
+        for index in (self._indexes or {}).values():
+            index.rebuild()
+        # end for
+    # end def
+
+    def index_stats(self):
+        """
+        Gets statistics about the indexes of this list.
+
+            >>> l = DictObjectList([{"id": 1, "team": "a"}, {"id": 2, "team": "a"}])
+            >>> _ = l.create_index("team")
+            >>> _ = l.find(team="a"), l.find(team="b")
+            >>> l.index_stats()[("team",)] == {
+            ...     "unique": False, "keys": 1, "rows": 2, "hits": 1, "misses": 1, "rebuilds": 1, "dirty": False,
+            ... }
+            True
+
+        :return: A dict of fields: dict of statistics, see DictObjectListIndex.stats().
+        """
+        return {fields: index.stats() for fields, index in (self._indexes or {}).items()}
+    # end def
+
+    def _check_indexes(self, rows, removed=()):
+        for index in self._indexes.values():
+            index.check(rows, removed)
+        # end for
+    # end def
+
+    def _update_indexes(self, added=(), removed=()):
+        for index in self._indexes.values():
+            for row in removed:
+                index.remove(row)
+            # end for
+            for row in added:
+                index.add(row)
+            # end for
+        # end for
+    # end def
+
+    def _invalidate_indexes(self):
+        for index in self._indexes.values():
+            index.dirty = True
+        # end for
+    # end def
+
+    def freeze(self):
+        """
+        :return: An immutable and hashable copy of this. See FrozenDictObjectList.
+        """
+        return _freeze(self)
+    # end def
+
+    def snapshot(self):
+        """
+        Gets a read-only view of this, which doesn't change when this is changed later. See DictObject.snapshot().
+
+            >>> l = DictObjectList([1, {"a": 2}])
+            >>> snap = l.snapshot()
+            >>> l.sort(key=lambda x: 0 if isinstance(x, dict) else 1)
+            >>> l[0].a = 3
+            >>> snap, l
+            ([1, {'a': 2}], [{'a': 3}, 1])
+
+        :return: The view, a DictObjectListSnapshot.
+        """
+        return DictObjectListSnapshot(self, _SnapshotToken())
+    # end def
+
+    @classmethod
+    def from_records(cls, rows, columnar=False):
+        """
+        Creates a list of records (dicts).
+
+        :param rows: The records.
+        :param columnar: If it should be a ColumnarDictObjectList, storing one list per key,
+                         instead of one dict per record. Default: False
+        :return: The DictObjectList or ColumnarDictObjectList.
+        """
+        if columnar:
+            return ColumnarDictObjectList(rows)
+        # end if
+        return cls(rows)
+    # end def
+
+    def to_numpy(self, fields, dtype=None):
+        """
+        Gets the values of one or more keys of all the records (dicts) in this list, as numpy array.
+        With a list of keys it is a structured array, with one field per key.
+
+            >>> l = DictObjectList([{"id": 1, "price": 2.5}, {"id": 2, "price": 4.0}])
+            >>> l.to_numpy("price")  # doctest: +SKIP
+            array([2.5, 4. ])
+            >>> l.to_numpy(["id", "price"])  # doctest: +SKIP
+            array([(1, 2.5), (2, 4. )], dtype=[('id', '<i8'), ('price', '<f8')])
+
+        numpy is optional. Without it, you get `array.array`s (a dict of them for a list of keys),
+        so only numbers are possible. `dtype` is an array typecode then.
+
+            >>> numpy = _import_numpy()
+            >>> ids = l.to_numpy("id", dtype=None if numpy else "q")
+            >>> list(ids)
+            [1, 2]
+
+        :param fields: The key, or a list of keys.
+        :param dtype: The numpy dtype. Default: None, guessing it from the values.
+        :return: The numpy array (or array.array).
+        """
+        single = not isinstance(fields, (list, tuple))
+        names = [fields] if single else list(fields)
+        # list.__iter__, as the not yet objectified dicts of a LazyDictObjectList work as well.
+        columns = [list(map(operator.itemgetter(name), list.__iter__(self))) for name in names]
+        return _columns_to_numpy(names, columns, dtype, single)
+    # end def
+
+    @classmethod
+    def from_numpy(cls, data, columnar=False):
+        """
+        Creates a list of records from a numpy structured array, with one record (dict) per row.
+        It also takes a dict of columns, e.g. from to_numpy() without numpy.
+
+            >>> DictObjectList.from_numpy({"id": array.array("q", [1, 2]), "price": [2.5, 4.0]})
+            [{'id': 1, 'price': 2.5}, {'id': 2, 'price': 4.0}]
+
+        :param data: The structured array, or a dict of key: column.
+        :param columnar: If it should return a ColumnarDictObjectList. Default: False
+        :return: The DictObjectList (or ColumnarDictObjectList).
+        """
+        if isinstance(data, dict):
+            names = list(data)
+            columns = [data[name] for name in names]
+        else:
+            names = data.dtype.names
+            if not names:
+                raise TypeError("Only structured arrays (with named fields) can be turned into records.")
+            # end if
+            columns = [data[name] for name in names]
+        # end if
+        # tolist() turns all the numpy values into python ones at once.
+        columns = [column.tolist() if hasattr(column, "tolist") else list(column) for column in columns]
+        if columnar:
+            return ColumnarDictObjectList.from_columns(dict(zip(names, columns)))
+        # end if
+        return cls([dict(zip(names, values)) for values in zip(*columns)])
     # end def
 # end class
 
@@ -176,19 +1019,230 @@ class DictObjectSet(set, MutableSet, SelfObjectifyMixin):
 
     def __init__(self, iterable=None):
         super(DictObjectSet, self).__init__(DictObjectSet.iterator_objectified(iterable))
+        if _snapshots.epoch and _snapshots.live:
+            self._cow_epoch = _snapshots.epoch  # no snapshot can have seen it before.
+        # end if
     # end def __init__
 
     def add(self, element):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
         super(DictObjectSet, self).add(DictObject.objectify(element))
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
     # end def
 
     def update(self, *values):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
         super(DictObjectSet, self).update(*DictObject.objectify(values))
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def discard(self, element):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectSet, self).discard(element)
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def remove(self, element):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectSet, self).remove(element)
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def pop(self):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        element = super(DictObjectSet, self).pop()
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+        return element
+    # end def
+
+    def clear(self):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectSet, self).clear()
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def difference_update(self, *others):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectSet, self).difference_update(*others)
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def intersection_update(self, *others):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectSet, self).intersection_update(*others)
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    def symmetric_difference_update(self, other):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        super(DictObjectSet, self).symmetric_difference_update(DictObjectSet.iterator_objectified(other))
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
+
+    # The in-place operators of set don't call the methods above, and only take sets, like those of set.
+
+    def __ior__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        # end if
+        self.update(other)
+        return self
+    # end def
+
+    def __iand__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        # end if
+        self.intersection_update(other)
+        return self
+    # end def
+
+    def __isub__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        # end if
+        self.difference_update(other)
+        return self
+    # end def
+
+    def __ixor__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        # end if
+        self.symmetric_difference_update(other)
+        return self
+    # end def
+# end class
+
+
+def _default_hook(func):
+    """
+    Marks the do-nothing implementation of a DictObject hook (on_get, after_set, ...),
+    so DictObjectType can tell if a class overrides it.
+    """
+    func.is_default_hook = True
+    return func
+# end def
+
+
+def _with_metaclass(meta, *bases):
+    """
+    Create a base class with a metaclass, working in both python 2 and 3. Like six.with_metaclass().
+    """
+    class metaclass(meta):
+        def __new__(cls, name, this_bases, d):
+            return meta(name, bases, d)
+        # end def
+    # end class
+    return type.__new__(metaclass, 'temporary_class', (), {})
+# end def
+
+
+class DictObjectType(type):
+    """
+    Metaclass of DictObject.
+
+    When a class is created, it checks which of the on_*/after_* hooks it (or a parent) overrides.
+    The getters, setters and deleters only call the hooks of a kind (get, set, del) when one of them is overridden,
+    so for a plain DictObject reading and writing doesn't need any hook method calls at all.
+
+        >>> DictObject._uses_get_hooks, DictObject._uses_set_hooks, DictObject._uses_del_hooks
+        (False, False, False)
+        >>> class Shouting(DictObject):
+        ...     def after_get(self, key, value):
+        ...         return value.upper()
+        >>> Shouting._uses_get_hooks, Shouting._uses_set_hooks, Shouting._uses_del_hooks
+        (True, False, False)
+        >>> Shouting(greeting="hello").greeting
+        'HELLO'
+
+    Hooks set on the class later are noticed as well.
+
+        >>> def on_del(self, key):
+        ...     return False  # never delete anything.
+        >>> Shouting.on_del = on_del
+        >>> Shouting._uses_del_hooks
+        True
+        >>> s = Shouting(greeting="hello")
+        >>> del s["greeting"]
+        >>> s.greeting
+        'HELLO'
+    """
+    _hooks = {
+        "_uses_get_hooks": ("on_get", "after_get"),
+        "_uses_set_hooks": ("on_set", "after_set"),
+        "_uses_del_hooks": ("on_del", "after_del"),
+    }
+
+    def __init__(cls, name, bases, namespace):
+        super(DictObjectType, cls).__init__(name, bases, namespace)
+        cls._update_hook_flags()
+    # end def
+
+    def __setattr__(cls, name, value):
+        super(DictObjectType, cls).__setattr__(name, value)
+        if name.startswith(("on_", "after_")):
+            cls._update_hook_flags()
+        # end if
+    # end def
+
+    def _update_hook_flags(cls):
+        for flag, hooks in cls._hooks.items():
+            type.__setattr__(cls, flag, any(cls._overrides_hook(hook) for hook in hooks))
+        # end for
+        for subclass in cls.__subclasses__():
+            subclass._update_hook_flags()
+        # end for
+    # end def
+
+    def _overrides_hook(cls, hook):
+        for klass in cls.__mro__:
+            if hook in klass.__dict__:
+                return not getattr(klass.__dict__[hook], "is_default_hook", False)
+            # end if
+        # end for
+        return False
     # end def
 # end class
 
 
-class DictObject(SomeDict):
+class DictObject(_with_metaclass(DictObjectType, SomeDict)):
     """
     DictObject is a subclass of dict with attribute-style access.
 
@@ -317,17 +1371,26 @@ class DictObject(SomeDict):
             True
 
     """
+    # no __dict__ needed, unless other attributes are set. _cow_epoch and _cow_history: See _Snapshots
+    __slots__ = ("_attribute_to_key_map", "_cow_epoch", "_cow_history")
+    _observer = None  # See _set_observer()
+
+    def __new__(cls, *args, **kwargs):
+        self = super(DictObject, cls).__new__(cls)
+        dict.__setattr__(self, "_attribute_to_key_map", _EMPTY_ATTRIBUTE_MAP)
+        # Slots have no default. No snapshot can have seen a new one, so it counts as saved in the current epoch.
+        dict.__setattr__(self, "_cow_epoch", _snapshots.epoch)
+        dict.__setattr__(self, "_cow_history", None)
+        return self
+    # end def
 
     def __init__(self, *args, **kwargs):
-        if len(args) == 1:
-            dict.__init__(self, *args, **kwargs)
-        else:
-            dict.__init__(self, **kwargs)
-        # end if
-        self._attribute_to_key_map = {}  # else they will be still here if i instanciate a new one.
+        # Note: no dict.__init__(self, ...) here, merge_dict() stores every key (objectified) anyway.
+        self._attribute_to_key_map = _EMPTY_ATTRIBUTE_MAP  # else they will be still here if i instanciate a new one.
         """ 
         Resolves the attributes (properties) of this class instance to the original dict's attributes.
         So `dict.foo_2_4_` can be resolved as `dict["foo-: '.4;"]`.
+        It may be shared with other instances (see SharedAttributeMaps), use _own_attribute_map() before changing it.
         
         The key is the attribute name,
         the value is the full, original name used as original key.
@@ -335,23 +1398,51 @@ class DictObject(SomeDict):
             "int_1"    > "1"
             "foo_2_4_" > "foo-: '2.4;"
         """
-        # process kwarg elements als key=value for this dict.
-        kwargs_dict = dict(**kwargs)
         for arg in args:
             self.merge_dict(arg)
-        self.merge_dict(kwargs_dict)
+        # end for
+        if kwargs:
+            # process kwarg elements als key=value for this dict.
+            self.merge_dict(kwargs)
+        # end if
 
     @classmethod
-    def objectify(cls, obj):
+    def objectify(cls, obj, lazy=False):
+        """
+        Turns dicts into DictObjects, lists into DictObjectLists and sets into DictObjectSets, recursively.
+
+        With `lazy=True` only the outermost container is wrapped, and nested dicts and lists are kept as they are,
+        until they are accessed the first time. See LazyDictObject for more.
+
+            >>> o = DictObject.objectify({"a": {"b": [{"c": 1}]}}, lazy=True)
+            >>> isinstance(o, LazyDictObject)
+            True
+            >>> type(dict.__getitem__(o, "a")) is dict  # not touched yet
+            True
+            >>> o.a.b[0].c
+            1
+            >>> isinstance(dict.__getitem__(o, "a"), LazyDictObject)  # cached now
+            True
+
+        :param obj: The object to objectify.
+        :param lazy: If nested values should only be objectified when they are first accessed. Default: False
+        :return: The objectified version of obj.
+        """
         if isinstance(obj, (DictObject, DictObjectList, DictObjectSet)):
             return obj
         elif isinstance(obj, list):  # add all list elements
-            return DictObjectList(DictObject.objectify(x) for x in obj)
+            if lazy:
+                return LazyDictObjectList(obj)
+            return DictObjectList(obj)  # which objectifies the elements
         elif isinstance(obj, set):
-            return DictObjectSet(DictObject.objectify(x) for x in obj)
+            if lazy:
+                return DictObjectSet(DictObject.objectify(x, lazy=True) for x in obj)
+            return DictObjectSet(obj)  # which objectifies the elements
         elif isinstance(obj, tuple):
-            return type(obj)(DictObject.objectify(x) for x in obj)
+            return type(obj)(DictObject.objectify(x, lazy=lazy) for x in obj)
         elif isinstance(obj, dict):  # add dict recursivly
+            if lazy:
+                return LazyDictObject(obj)
             return DictObject(obj)
         else:  # add single element
             return obj
@@ -359,7 +1450,7 @@ class DictObject(SomeDict):
     # end def
 
     @classmethod
-    def normalify(cls, obj):
+    def normalify(cls, obj, copy=True, inplace=False):
         """
         Reverses the effect of DictObject.objectify().
         DictObject becomes a dict again, and DictObjectList becomes a list again.
@@ -388,14 +1479,49 @@ class DictObject(SomeDict):
             >>> isinstance(i['list'][3], DictObject), isinstance(o['list'][3], DictObject), isinstance(d['list'][3], DictObject)
             (False, True, False)
 
+        DictObjects, DictObjectLists and DictObjectSets are subclasses of dict, list and set.
+        So if the consumer accepts subclasses (like json, or msgpack), there is no need to copy anything,
+        use `copy=False` to get the object itself.
 
-        :param obj:
-        :return:
+            >>> DictObject.normalify(o, copy=False) is o
+            True
+
+        If the DictObject isn't needed any longer, `inplace=True` strips the wrappers without copying everything:
+        Every DictObject and DictObjectList is emptied as soon as its plain version is built,
+        so the tree doesn't exist twice. The given object is empty afterwards, and so are nested ones you still have
+        a reference to. Plain dicts and lists (e.g. not yet accessed values of a LazyDictObject) are used as they are,
+        if there is nothing to convert in them. They are never changed, as they can belong to someone else.
+        (A dict or list can't become one of the other type, so every DictObject still needs a new dict.)
+        So it allocates about as much as copying, but the original is freed while doing so, which lowers the peak
+        memory (about 30% less for a tree of DictObjects, see `benchmark.py normalify`). The emptied ones are
+        remembered until it is done, in case one is in the tree twice, which costs about half the size of the result.
+        For a LazyDictObject, whose plain values are used as they are, the peak is about half of copying.
+
+            >>> lazy = LazyDictObject(i)
+            >>> _ = lazy.list  # objectified now, the rest is still plain
+            >>> d = DictObject.normalify(lazy, inplace=True)
+            >>> d == i, type(d) is dict, type(d['list']) is list, type(d['list'][3]) is dict
+            (True, True, True, True)
+            >>> d['dict'] is i['dict']  # not copied
+            True
+            >>> lazy, i == o  # the data the LazyDictObject was created from is unchanged.
+            ({}, True)
+
+        :param obj: The object to convert.
+        :param copy: If it should build plain copies. With `False` obj is returned as it is. Default: True
+        :param inplace: If obj should be emptied while building the plain version. Default: False
+        :return: The plain version.
         """
+        if inplace:
+            return _normalify_inplace(obj, {})
+        elif not copy:
+            return obj
+        # end if
         if isinstance(obj, DictObject):
-            return DictObject.normalify(dict(obj))
+            # dict.items() and list.__iter__() to read the stored values, without objectifying lazy ones.
+            return {k: DictObject.normalify(v) for k, v in dict.items(obj)}
         elif isinstance(obj, DictObjectList):
-            return DictObject.normalify(list(obj))
+            return [DictObject.normalify(x) for x in list.__iter__(obj)]
         elif isinstance(obj, DictObjectSet):
             return DictObject.normalify(set(obj))
         elif isinstance(obj, (list, tuple, set,)):  # add all list-like elements
@@ -409,6 +1535,231 @@ class DictObject(SomeDict):
         # end if
     # end def
 
+    @classmethod
+    def iter_jsonl(cls, file, skip_errors=False, errors=None, lazy=False):
+        """
+        Reads a JSON Lines file (one json document per line), and yields every line objectified.
+        It is a generator, so only one line is in memory at a time.
+        Records with the same keys share the same attribute map (see SharedAttributeMaps).
+
+            >>> import io
+            >>> data = io.StringIO(u'{"id": 1, "user-name": "Littlepip"}\\n\\n{"id": 2, "user-name": "Calamity"}\\n')
+            >>> records = list(DictObject.iter_jsonl(data))
+            >>> [record.user_name for record in records]
+            ['Littlepip', 'Calamity']
+            >>> records[0]._attribute_to_key_map is records[1]._attribute_to_key_map
+            True
+
+        Broken lines raise a ValueError, unless `skip_errors` is set.
+        Then they are skipped, and with `errors` being a list, `(line_number, line, exception)` is added to it.
+
+            >>> data = io.StringIO(u'{"id": 1}\\n{"id": \\n[1, {"a": 2}]\\n')
+            >>> try:
+            ...     records = list(DictObject.iter_jsonl(data))
+            ... except ValueError:  # json.JSONDecodeError in python 3
+            ...     print("broken line")
+            broken line
+            >>> errors = []
+            >>> data.seek(0)
+            0
+            >>> records = list(DictObject.iter_jsonl(data, skip_errors=True, errors=errors))
+            >>> records
+            [{'id': 1}, [1, {'a': 2}]]
+            >>> isinstance(records[1][1], DictObject)
+            True
+            >>> len(errors), errors[0][0]
+            (1, 2)
+
+        :param file: The file object to read, or the path of a file to open.
+        :param skip_errors: If lines which aren't valid json should be skipped, instead of raising a ValueError.
+        :param errors: A list, to append the skipped lines to, as `(line_number, line, exception)`.
+        :param lazy: If the records should be LazyDictObjects. See objectify().
+        :return: A generator of the objectified records.
+        """
+        if not hasattr(file, "read"):
+            with open(file, "r", buffering=1024 * 1024) as opened_file:
+                for record in cls.iter_jsonl(opened_file, skip_errors=skip_errors, errors=errors, lazy=lazy):
+                    yield record
+                # end for
+            # end with
+            return
+        # end if
+        # Building the DictObjects bottom up with the object_hook, so nothing has to be checked (and copied) twice.
+        decoder = json.JSONDecoder(object_hook=None if lazy else cls)
+        objectify = cls.objectify
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            # end if
+            try:
+                record = decoder.decode(line if not isinstance(line, encoding.binary_type) else line.decode("utf-8"))
+            except ValueError as e:
+                if not skip_errors:
+                    raise
+                # end if
+                logger.debug("Skipping invalid json in line {line_number}: {e}".format(line_number=line_number, e=e))
+                if errors is not None:
+                    errors.append((line_number, line, e))
+                # end if
+                continue
+            # end try
+            yield objectify(record, lazy=lazy)
+        # end for
+    # end def
+
+    @classmethod
+    def write_jsonl(cls, iterable, file, chunk_size=1000):
+        """
+        Writes the given records as JSON Lines (one json document per line).
+        The iterable is consumed one by one, so it can be a generator as well.
+
+            >>> import io
+            >>> file = io.StringIO()
+            >>> DictObject.write_jsonl([DictObject(id=1), {"id": 2, "tags": ["a"]}], file)
+            2
+            >>> print(file.getvalue().strip())
+            {"id":1}
+            {"id":2,"tags":["a"]}
+            >>> file.seek(0)
+            0
+            >>> list(DictObject.iter_jsonl(file)) == [{"id": 1}, {"id": 2, "tags": ["a"]}]
+            True
+
+            Sets are written as lists, like to_json() does:
+
+            >>> file = io.StringIO()
+            >>> DictObject.write_jsonl([DictObject(tags={"a"})], file)
+            1
+            >>> print(file.getvalue().strip())
+            {"tags":["a"]}
+
+        :param iterable: The records to write.
+        :param file: The file object to write to, or the path of a file to create.
+        :param chunk_size: How many lines to collect, before writing them to the file at once.
+        :return: The number of records written.
+        """
+        if not hasattr(file, "write"):
+            with open(file, "w", buffering=1024 * 1024) as opened_file:
+                return cls.write_jsonl(iterable, opened_file, chunk_size=chunk_size)
+            # end with
+        # end if
+        dumps = json.JSONEncoder(separators=(',', ':'), default=_json_default).encode
+        count = 0
+        lines = []
+        for record in iterable:
+            lines.append(dumps(record))
+            count += 1
+            if len(lines) >= chunk_size:
+                lines.append("")  # so join adds the last newline as well
+                file.write(u"\n".join(lines))
+                lines = []
+            # end if
+        # end for
+        if lines:
+            lines.append("")
+            file.write(u"\n".join(lines))
+        # end if
+        return count
+    # end def
+
+    def to_json(self, indent=None, sort_keys=False, ensure_ascii=True):
+        """
+        Serializes this DictObject to json, directly, without copying it with normalify() first.
+        Sets are written as lists, and objects with an `as_dict()` method as what that returns.
+
+            >>> o = DictObject({"b": [1, {"c": None}], "a": "ä"})
+            >>> o.to_json()
+            '{"b":[1,{"c":null}],"a":"\\\\u00e4"}'
+            >>> print(o.to_json(indent=2, sort_keys=True, ensure_ascii=False))
+            {
+              "a": "ä",
+              "b": [
+                1,
+                {
+                  "c": null
+                }
+              ]
+            }
+            >>> DictObject(tags={"x"}).to_json()
+            '{"tags":["x"]}'
+
+        :param indent: `None` for compact json, else the number of spaces to indent with. Default: None
+        :param sort_keys: If the keys should be sorted, else they are in insertion order. Default: False
+        :param ensure_ascii: If non-ASCII characters should be escaped. Default: True
+        :return: The json string.
+        """
+        # With indent=None json uses its C encoder, which handles dict and list subclasses natively.
+        return json.dumps(
+            self, indent=indent, sort_keys=sort_keys, ensure_ascii=ensure_ascii,
+            separators=(',', ':') if indent is None else (',', ': '), default=_json_default,
+        )
+    # end def
+
+    def dump(self, file, indent=None, sort_keys=False, ensure_ascii=True):
+        """
+        Writes this DictObject as json to a file. See to_json() for the parameters.
+
+            >>> import io
+            >>> file = io.StringIO()
+            >>> DictObject(a=1).dump(file)
+            >>> file.getvalue()
+            '{"a":1}'
+
+        :param file: The file object to write to, or the path of a file to create.
+        """
+        if not hasattr(file, "write"):
+            with open(file, "w") as opened_file:
+                return self.dump(opened_file, indent=indent, sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+            # end with
+        # end if
+        # One string and one write() call. json.dump() would write in small pieces, with the slower python encoder.
+        file.write(encoding.unicode_type(self.to_json(indent=indent, sort_keys=sort_keys, ensure_ascii=ensure_ascii)))
+    # end def
+
+    @classmethod
+    def load(cls, file, include=None, chunk_size=65536):
+        """
+        Reads a json document from a file, building the DictObjects while reading.
+        Unlike `DictObject.objectify(json.load(file))` it never holds the whole text, or a second (plain) copy
+        of the data in memory. The file is read in chunks of `chunk_size` characters.
+
+            >>> import io
+            >>> data = u'{"users": [{"id": 1, "name": "Littlepip", "tags": ["a"]}, {"id": 2, "name": "Calamity"}], "total": 2}'
+            >>> o = DictObject.load(io.StringIO(data), chunk_size=16)
+            >>> o == json.loads(data)
+            True
+            >>> o.users[0].name, isinstance(o.users[0].tags, DictObjectList)
+            ('Littlepip', True)
+
+        With `include` only the given paths are loaded, everything else is skipped.
+        The parts of a path are separated by dots, `*` matches every key, or every index of a list.
+
+            >>> DictObject.load(io.StringIO(data), include=["users.*.id", "total"]) == {"users": [{"id": 1}, {"id": 2}], "total": 2}
+            True
+            >>> DictObject.load(io.StringIO(data), include=["users.1"], chunk_size=16)
+            {'users': [{'id': 2, 'name': 'Calamity'}]}
+
+        Invalid json raises a ValueError.
+
+            >>> DictObject.load(io.StringIO(u'{"a": [1, 2}'))
+            Traceback (most recent call last):
+                ...
+            ValueError: Expecting ',' delimiter: char 11
+
+        :param file: The file object to read, or the path of a file to open.
+        :param include: List of paths to load, e.g. `["users.*.id"]`. A path can be a list as well,
+                        for keys containing dots. Default: None, loading everything.
+        :param chunk_size: How much to read at once.
+        :return: The DictObject (or DictObjectList, ...) of the document.
+        """
+        if not hasattr(file, "read"):
+            with open(file, "r") as opened_file:
+                return cls.load(opened_file, include=include, chunk_size=chunk_size)
+            # end with
+        # end if
+        return _StreamingJSONLoader(file, include=include, chunk_size=chunk_size).load()
+    # end def
+
     def merge_dict(self, d):
         """
         ---------------
@@ -455,16 +1806,288 @@ class DictObject(SomeDict):
         if not isinstance(d, dict):
             raise TypeError("Argument is no dict.")
         # self._dict = d
-        for a, b in d.items():
-            attribute_name = self.get_attribute_name_by_key(a)
-            self._add_to_object_part(a, b)
-            self._attribute_to_key_map[n(attribute_name)] = a
+        add_to_object_part = self._add_to_object_part
+        if not self._attribute_to_key_map and not self:
+            # An empty object getting the same keys as others before can reuse their attribute map.
+            shared = shared_attribute_maps.get(d)
+            if shared is not None:
+                for key, value in d.items():
+                    add_to_object_part(key, value)
+                # end for
+                self._attribute_to_key_map = shared
+                return self
+            # end if
+        # end if
+        attribute_to_key_map = self._own_attribute_map()
+        get_attribute_name_by_key = self.get_attribute_name_by_key
+        for key, value in d.items():
+            add_to_object_part(key, value)
+            # get_attribute_name_by_key() already returns a native string, no need for n().
+            attribute_to_key_map[get_attribute_name_by_key(key)] = key
+        # end for
+        shared_attribute_maps.share(self)
         return self
 
+    def _own_attribute_map(self):
+        """
+        Makes sure the attribute map isn't shared with other instances, so it can be changed.
+
+        :return: The now not shared attribute map.
+        """
+        attribute_to_key_map = self._attribute_to_key_map
+        if type(attribute_to_key_map) is _SharedAttributeMap:
+            attribute_to_key_map = dict(attribute_to_key_map)
+            self._attribute_to_key_map = attribute_to_key_map
+        # end if
+        return attribute_to_key_map
+
     def __iadd__(self, other):
         self.merge_dict(other)
         return self
 
+    def freeze(self):
+        """
+        :return: An immutable and hashable copy of this. See FrozenDictObject.
+        """
+        return _freeze(self)
+    # end def
+
+    @staticmethod
+    def diff(old, new):
+        """
+        Gets the changes from `old` to `new`, as a list of operations you can apply to `old` with apply_patch().
+        An operation is a dict like `{"op": "set", "path": ["users", 0, "name"], "value": "Littlepip"}`
+        or `{"op": "del", "path": ["users", 1]}`, the same format as the journal of JournalAutosaveDictObject,
+        and the values are normal dicts and lists (see normalify()), so it can be stored or sent as json.
+
+            >>> old = DictObject({"name": "foo", "tags": ["a", "b"], "meta": {"views": 1, "owner": "x"}})
+            >>> new = DictObject({"name": "foo", "tags": ["a", "c", "d"], "meta": {"views": 2}})
+            >>> ops = DictObject.diff(old, new)
+            >>> for op in ops:
+            ...     print(op)  # doctest: +NORMALIZE_WHITESPACE
+            {'op': 'set', 'path': ['tags', 1], 'value': 'c'}
+            {'op': 'set', 'path': ['tags', 2], 'value': 'd'}
+            {'op': 'del', 'path': ['meta', 'owner']}
+            {'op': 'set', 'path': ['meta', 'views'], 'value': 2}
+            >>> old.apply_patch(ops)
+            >>> old == new
+            True
+
+        Lists are compared by position, sets as a whole. The same object is skipped right away,
+        and frozen ones with the same cached hash (see FrozenDictObject) are compared with one `==` first,
+        instead of key by key. Sets are stored as lists in the values, as json has no sets.
+
+            >>> DictObject.diff({"tags": DictObjectSet(["a"])}, {"tags": {"a"}})
+            []
+            >>> DictObject.diff({}, {"tags": frozenset(["a"])})
+            [{'op': 'set', 'path': ['tags'], 'value': ['a']}]
+
+        :param old: The DictObject (or any dict or list) before.
+        :param new: The one after.
+        :return: The list of operations, an empty one if they are equal.
+        """
+        ops = []
+        _diff(old, new, [], ops)
+        return ops
+    # end def
+
+    def apply_patch(self, ops):
+        """
+        Applies the operations from diff() to this, in place.
+        It uses the normal item setting and deleting, so the hooks (see on_set()) run,
+        and an AutosaveDictObject saves the changes.
+
+            >>> class Logged(DictObject):
+            ...     def after_set(self, key, value):
+            ...         print("set " + key)
+            >>> obj = Logged({"a": 1, "b": [1, 2, 3]})
+            >>> obj.apply_patch([{"op": "set", "path": ["a"], "value": 2}, {"op": "del", "path": ["b", 2]}])
+            set a
+            >>> obj
+            {'a': 2, 'b': [1, 2]}
+
+        A "set" of the index after the last element of a list appends to it.
+        An empty path is the whole object, its keys are replaced one by one, with the hooks as well:
+
+            >>> obj.apply_patch([{"op": "set", "path": [], "value": {"c": 3}}])
+            set c
+            >>> obj
+            {'c': 3}
+
+        :param ops: The list of operations.
+        """
+        for op in ops:
+            path = op["path"]
+            if not path:  # the whole object
+                value = op["value"] if op["op"] == "set" else {}
+                for key in list(self.keys()):
+                    if key not in value:
+                        del self[key]
+                    # end if
+                # end for
+                for key, item in value.items():
+                    self[key] = item
+                # end for
+                continue
+            # end if
+            container = self
+            for key in path[:-1]:
+                container = container[key]
+            # end for
+            key = path[-1]
+            if op["op"] == "set":
+                if isinstance(container, list) and key == len(container):
+                    container.append(op["value"])
+                else:
+                    container[key] = op["value"]
+                # end if
+            elif op["op"] == "del":
+                del container[key]
+            else:
+                raise ValueError("Unknown patch operation {op!r}.".format(op=op["op"]))
+            # end if
+        # end for
+    # end def
+
+    def snapshot(self):
+        """
+        Gets a read-only view of this, which doesn't change when this is changed later.
+        Taking it is O(1), it shares the data with this. Only when a dict, list or set in here gets changed
+        for the first time after a snapshot, a copy of that one is kept for the snapshots (copy on write).
+        So a reader (e.g. in another thread) gets a consistent view, while a writer keeps changing the data.
+        Taking the snapshot is an access like any other, so do it in the writer thread or under the lock the writer
+        uses, but reading the snapshot afterwards needs no lock, even while the writer changes the data.
+
+            >>> obj = DictObject({"users": [{"name": "Littlepip"}], "count": 1})
+            >>> snap = obj.snapshot()
+            >>> obj.users[0].name = "Velvet Remedy"
+            >>> obj.users.append({"name": "Calamity"})
+            >>> obj.count = 2
+            >>> snap.users[0].name, len(snap.users), snap.count
+            ('Littlepip', 1, 1)
+            >>> snap
+            {'users': [{'name': 'Littlepip'}], 'count': 1}
+            >>> obj.snapshot() == obj
+            True
+            >>> snap.count = 3
+            Traceback (most recent call last):
+            ...
+            TypeError: A snapshot is read-only.
+
+        to_dict_object() gives you a changeable copy again.
+
+            >>> copied = snap.to_dict_object()
+            >>> copied.count += 1
+            >>> copied
+            {'users': [{'name': 'Littlepip'}], 'count': 2}
+
+        The view reads the stored values, so the get hooks (see on_get()) don't run.
+        The copies are released when the snapshots of that time are gone, and that dict, list or set changes again.
+
+        :return: The view, a DictObjectSnapshot.
+        """
+        return DictObjectSnapshot(self, _SnapshotToken())
+    # end def
+
+    @staticmethod
+    def record_type(keys_or_sample, name="Record"):
+        """
+        Creates a class for records which all have the same keys, storing the values in `__slots__`.
+        A record has no dict, `__dict__` or attribute map of its own, so it needs a lot less memory than a DictObject,
+        and reading an attribute is a plain slot access. It still has the same attribute names (see
+        get_attribute_name_by_key()), and works like a dict with the original keys.
+
+            >>> User = DictObject.record_type({"id": 1, "user-name": "Littlepip", "stats": {}})
+            >>> user = User({"id": 2, "user-name": "Calamity", "stats": {"luck": 5}})
+            >>> user.id, user.user_name, user["user-name"], user.stats.luck
+            (2, 'Calamity', 'Calamity', 5)
+            >>> user.user_name = "Velvet Remedy"
+            >>> user["user-name"]
+            'Velvet Remedy'
+            >>> user == {"id": 2, "user-name": "Velvet Remedy", "stats": {"luck": 5}}
+            True
+            >>> user.to_dict_object() == user, type(user.to_dict_object()) is DictObject
+            (True, True)
+
+        The keys are fixed, other keys can't be added.
+
+            >>> user["email"] = "calamity@example.com"
+            Traceback (most recent call last):
+                ...
+            KeyError: "'email' is not a key of Record."
+
+        The same keys get the same class, as long as they are one of the last 1000 different ones used.
+        If you create them from keys only known at runtime, better keep the class yourself.
+
+            >>> DictObject.record_type(["id", "user-name", "stats"]) is User
+            True
+
+        :param keys_or_sample: The keys, or a dict with those keys.
+        :param name: The name of the created class.
+        :return: The class, a subclass of DictObjectRecord.
+        """
+        keys = tuple(keys_or_sample.keys() if isinstance(keys_or_sample, dict) else keys_or_sample)
+        cache_key = (name, tuple((type(key), key) for key in keys))
+        record_class = _record_types.get(cache_key)
+        if record_class is None:
+            record_class = _create_record_type(keys, name)
+            _record_types.set(cache_key, record_class)
+        # end if
+        return record_class
+    # end def
+
+    @staticmethod
+    def compile_path(path):
+        """
+        Parses a path into nested values once, and gives you an accessor you can use for many objects.
+        It reads the dicts and lists directly, instead of going through `__getattr__` for every step.
+
+            >>> obj = DictObject({"data": {"items": [{"attrs": {"name": "a"}}, {"attrs": {}}, {"attrs": {"name": "c"}}]}})
+            >>> name = DictObject.compile_path("data.items[0].attrs.name")
+            >>> name(obj)
+            'a'
+            >>> DictObject.compile_path("data.items[1].attrs.name").get(obj, "unknown")
+            'unknown'
+            >>> DictObject.compile_path("data.items[-1].attrs.name").get(obj)
+            'c'
+
+        `[*]` (or `.*`) goes into all the elements of a list (or values of a dict).
+        You get a list of all the values found.
+
+            >>> DictObject.compile_path("data.items[*].attrs.name")(obj)
+            ['a', 'c']
+
+        A key which isn't a valid name can be quoted, `a["some key"]`, and the attribute names work too.
+
+            >>> DictObject.compile_path('data["the-key"]').get({"data": {"the-key": 1}})
+            1
+            >>> DictObject.compile_path("data.the_key").get(DictObject({"data": {"the-key": 2}}))
+            2
+
+        get_many() reads the same path from a lot of objects.
+
+            >>> name.get_many([obj, {}], default=None)
+            ['a', None]
+
+        Without a default, a value which doesn't exist is a KeyError.
+
+            >>> name({})
+            Traceback (most recent call last):
+            ...
+            KeyError: 'data.items[0].attrs.name'
+
+        :param path: The path, e.g. `data.items[*].attrs.name`.
+        :return: The accessor, a DictObjectPath. The same path gets the same accessor, as long as it is one of the
+                 last 1000 different ones used. For paths built at runtime, keep the accessor yourself.
+        """
+        accessor = _compiled_paths.get(path)
+        if accessor is None:
+            accessor = DictObjectPath(path)
+            _compiled_paths.set(path, accessor)
+        # end if
+        return accessor
+    # end def
+
     @staticmethod
     def get_attribute_name_by_key(key):
         """
@@ -546,24 +2169,107 @@ class DictObject(SomeDict):
             CRITICAL WARNING in DictObject: Mapped key '1' to attribute 'int_1_1', because attribute 'int_1' was already set by key '1'.
 
 
-        """
+        The results are cached in `attribute_name_cache`, so this is only calculated once per key.
+
+            >>> attribute_name_cache.get('foo-2.4;"')
+            'foo_2_4_'
+            >>> attribute_name_cache.get(None)
+            'data_None'
+        """
+        attribute_name = attribute_name_cache.get(key)
+        if attribute_name is not None:
+            return attribute_name
+        # end if
+        attribute_name = str(key)
+        if attribute_name[0].isdigit():
+            attribute_name = "int_" + attribute_name
+        # to access  a = {'1':'foo'}  with DictObject(a).int_1
+        # Note:  a = {'2foo4u':'bar'} will be DictObject(a).int_2foo4u
+        elif not isinstance(key, (str, encoding.native_type, encoding.unicode_type)):
+            attribute_name = "data_" + str(attribute_name)
+        # a[None] = 'foo'  >   a.data_None
+
+        attribute_name = unallowed_in_variable_name.sub('_',
+                                                        attribute_name)  # a = {'foo-2.4;"':'foo'} becomes DictObject(a).foo_2_4_
+        attribute_name_cache.set(key, attribute_name)
+        return attribute_name
+
+    def _add_to_object_part(self, name, obj):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        dict.__setitem__(self, name, DictObject.objectify(obj))
+        return
+
+    def pop(self, key, *default):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        if self._observer is None or not dict.__contains__(self, key):
+            return dict.pop(self, key, *default)
+        # end if
+        value = dict.pop(self, key)
+        _observed_change(self)
+        return value
+    # end def
+
+    def popitem(self):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        item = dict.popitem(self)
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+        return item
+    # end def
+
+    def setdefault(self, key, default=None):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        if self._observer is None or dict.__contains__(self, key):
+            return dict.setdefault(self, key, default)
+        # end if
+        value = dict.setdefault(self, key, default)
+        _observed_change(self, value)
+        return value
+    # end def
 
-        attribute_name = str(key)
-        if str(key)[0].isdigit():
-            attribute_name = "int_" + str(attribute_name)
-        # to access  a = {'1':'foo'}  with DictObject(a).int_1
-        # Note:  a = {'2foo4u':'bar'} will be DictObject(a).int_2foo4u
-        elif not isinstance(key, (str, encoding.native_type, encoding.unicode_type)):
-            attribute_name = "data_" + str(attribute_name)
-        # a[None] = 'foo'  >   a.data_None
+    def update(self, *args, **kwargs):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        if self._observer is None:
+            dict.update(self, *args, **kwargs)
+            return
+        # end if
+        values = dict(*args, **kwargs)
+        dict.update(self, values)
+        _observed_change(self, tuple(values.values()))
+    # end def
 
-        attribute_name = unallowed_in_variable_name.sub('_',
-                                                        attribute_name)  # a = {'foo-2.4;"':'foo'} becomes DictObject(a).foo_2_4_
-        return attribute_name
+    def clear(self):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        dict.clear(self)
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+    # end def
 
-    def _add_to_object_part(self, name, obj):
-        dict.__setitem__(self, name, DictObject.objectify(obj))
-        return
+    if hasattr(dict, "__ior__"):  # python 3.9+
+        def __ior__(self, other):
+            if not isinstance(other, Mapping):
+                other = dict(other)
+            # end if
+            for key in other.keys():
+                self[key] = other[key]  # objectifies, and registers the attribute name.
+            # end for
+            return self
+        # end def
+    # end if
 
     # Items (Array/Dict)
 
@@ -617,10 +2323,19 @@ class DictObject(SomeDict):
                 "\nCRITICAL WARNING in DictObject: Mapped key '%s' to attribute '%s', "
                 "because attribute '%s' was already set by key '%s'." % (
                     key, unique_attribute_name, attribute_name, self._attribute_to_key_map[n(attribute_name)]))
-        value = self.on_set(key, value)
+        if self._uses_set_hooks:
+            value = self.on_set(key, value)
+        # end if
         self._add_to_object_part(key, value)
-        self._attribute_to_key_map[n(unique_attribute_name)] = key
-        self.after_set(key, value)
+        if self._attribute_to_key_map.get(unique_attribute_name, _NOT_FOUND) != key:  # updating keeps it shared
+            self._own_attribute_map()[unique_attribute_name] = key
+        # end if
+        if self._uses_set_hooks:
+            self.after_set(key, value)
+        # end if
+        if self._observer is not None:
+            _observed_change(self, dict.__getitem__(self, key))
+        # end if
 
     def __delitem__(self, key):
         """
@@ -642,11 +2357,20 @@ class DictObject(SomeDict):
         :param key: The key to delete.
         :return: Nothing.
         """
-        if self.on_del(key):
+        if not self._uses_del_hooks or self.on_del(key):
             attribute_name = self.get_attribute_name_by_key(key)
-            del self._attribute_to_key_map[n(attribute_name)]
+            del self._own_attribute_map()[attribute_name]
+            if self._cow_epoch != _snapshots.epoch:
+                _save_for_snapshots(self)
+            # end if
             dict.__delitem__(self, key)
-            self.after_del(key)
+            if self._uses_del_hooks:
+                self.after_del(key)
+            # end if
+            if self._observer is not None:
+                _observed_change(self)
+            # end if
+        # end if
 
     # Attributes (Object)
 
@@ -655,17 +2379,27 @@ class DictObject(SomeDict):
             # self._attribute_to_key_map = value
             super(DictObject, self).__setattr__(name, value)
             return
-        else:
-            key_name = self._attribute_to_key_map[n(name)] if n(
-                name) in self._attribute_to_key_map else name  # if there is a key representing this attribute
-        # update this key, too
-        value = self.on_set(name, value)
+        # end if
+        # if there is a key representing this attribute, update this key, too
+        key_name = self._attribute_to_key_map.get(name, name)
+        if self._uses_set_hooks:
+            value = self.on_set(name, value)
+        # end if
         self._add_to_object_part(name, value)  # needed allways to keep items  beeing recursive.
-        self._attribute_to_key_map[n(name)] = key_name  # needed only on adding new element. (not when updating)
-        # object.__setattr__(self, key, value)
-        dict.__setitem__(self, self._attribute_to_key_map[n(name)],
-                         DictObject.objectify(value))  # self[self._key_map[key]] = value
-        self.after_set(name, value)
+        if key_name != name:
+            # store the already objectified value for the key as well, instead of objectifying it a second time.
+            dict.__setitem__(self, key_name, dict.__getitem__(self, name))  # self[self._key_map[key]] = value
+        else:
+            if name not in self._attribute_to_key_map:  # needed only on adding new element. (not when updating)
+                self._own_attribute_map()[name] = key_name
+            # end if
+        # end if
+        if self._uses_set_hooks:
+            self.after_set(name, value)
+        # end if
+        if self._observer is not None:
+            _observed_change(self, dict.__getitem__(self, name))
+        # end if
 
     def __getattr__(self, name):
         """
@@ -683,40 +2417,31 @@ class DictObject(SomeDict):
         Traceback (most recent call last):
             ...
         AttributeError: notexist
+
+        Python only calls this after the normal lookup (methods, __dict__ and slots) failed,
+        so a data attribute only costs the lookup in the attribute map and the one in the dict.
+
+        >>> b = DictObject({"foo-bar": 1})
+        >>> b.foo_bar
+        1
+        >>> dict.pop(b, "foo-bar")  # key gone, but the map still has it.
+        1
+        >>> hasattr(b, "foo_bar")
+        False
         """
-        _exception = None  # py2
         try:
-            value = dict.__getattribute__(self,
-                                          n(name))  # Raise exception if not found in original dict's attributes either
-            return value
-        except AttributeError:
-            try:
-                if n(name) in self.__dict__:
-                    return self.__dict__[n(name)]
-                if self._attribute_to_key_map:
-                    key_name = self._attribute_to_key_map[n(name)]  # Check if we have this set.
-                    self.on_get(key_name)
-                    value = dict.__getitem__(self, key_name)  # self[key_name]
-                    value = self.after_get(key_name, value)
-                    return value
-                else:
-                    if not sys.version < '3':  # python 2.7
-                        raise suppress_context(AttributeError(name))
-                    # print("_attribute_to_key_map not defined.")
-                    _exception = AttributeError(name)
-                    _exception.__cause__ = None
-
-            except KeyError:
-                if not sys.version < '3':  # python 2.7
-                    raise suppress_context(AttributeError(name))
-                _exception = AttributeError(name)
-                _exception.__cause__ = None
-            finally:
-                if _exception:
-                    raise _exception
-        finally:
-            if _exception:
-                raise _exception
+            key_name = self._attribute_to_key_map[name]  # Check if we have this set.
+            if not self._uses_get_hooks:
+                return self[key_name]
+            # end if
+            self.on_get(key_name)
+            return self.after_get(key_name, self[key_name])
+        except KeyError:
+            pass
+        # end try
+        # raised outside of the except block, so there is no KeyError as __context__.
+        raise AttributeError(name)
+    # end def
 
     def __delattr__(self, name):
         """
@@ -731,15 +2456,25 @@ class DictObject(SomeDict):
 
         >>> del b._lol
         """
-        # object.__delattr__(self, item)
-        if name in self.__dict__:
-            del self.__dict__[name]
+        try:
+            super(DictObject, self).__delattr__(name)  # from __dict__ (or the slots)
+        except AttributeError:
+            pass
+        # end try
         if n(name) in self._attribute_to_key_map:
             key = self._attribute_to_key_map[n(name)]
-            if self.on_del(key):
+            if not self._uses_del_hooks or self.on_del(key):
+                if self._cow_epoch != _snapshots.epoch:
+                    _save_for_snapshots(self)
+                # end if
                 dict.__delitem__(self, key)
-                del self._attribute_to_key_map[n(name)]
-            self.after_del(key)
+                del self._own_attribute_map()[n(name)]
+                if self._observer is not None:
+                    _observed_change(self)
+                # end if
+            if self._uses_del_hooks:
+                self.after_del(key)
+            # end if
 
     def __contains__(self, k):
         """
@@ -768,11 +2503,13 @@ class DictObject(SomeDict):
         except:
             return False
 
+    @_default_hook
     def on_get(self, key):
         """
         Override this to do modify data, on an easy way,
         without the need to fiddle with all the getter
         and setter methods yourself.
+        The hooks are only called for classes overriding at least one of a kind (see DictObjectType).
 
         This will be called with the key.  (from the dict, not the attribute)
         To get or modify the value, use after_get
@@ -780,6 +2517,7 @@ class DictObject(SomeDict):
         """
         pass
 
+    @_default_hook
     def on_set(self, key, value_to_set):
         """
         Same idea as on_get()
@@ -790,6 +2528,7 @@ class DictObject(SomeDict):
         """
         return value_to_set
 
+    @_default_hook
     def on_del(self, key):
         """
         You got the idea. almost identical to on_get and on_set
@@ -801,6 +2540,7 @@ class DictObject(SomeDict):
         """
         return True
 
+    @_default_hook
     def after_get(self, key, value):
         """
         This is to get or modify the value, use after_get
@@ -824,6 +2564,7 @@ class DictObject(SomeDict):
 
         return value
 
+    @_default_hook
     def after_set(self, key, value):
         """
         Same as on_set, but the value is already stored,
@@ -831,6 +2572,7 @@ class DictObject(SomeDict):
         """
         pass
 
+    @_default_hook
     def after_del(self, key):
         """
         Same as on_del, but the key is already deleted.
@@ -846,8 +2588,44 @@ class DictObject(SomeDict):
         return super(DictObject, self).__reduce__()
     # end def
 
+    def __copy__(self):
+        """
+        A shallow copy, for copy.copy(). See __deepcopy__().
+        """
+        return _copy_node(self)
+    # end def
+
+    def __deepcopy__(self, memo):
+        """
+        Copies the whole tree in one pass, for copy.deepcopy(). Instead of rebuilding every DictObject
+        with __reduce_ex__() and __setstate__(), it copies the stored values directly, without calculating
+        the attribute names again. Immutable values (numbers, strings, ...) are not copied.
+
+            >>> import copy
+            >>> a = DictObject({"user-name": "Littlepip", "data": {"list": [1, {"b": 2}], "set": {3}}})
+            >>> b = copy.deepcopy(a)
+            >>> b == a, b.data.list[1] is a.data.list[1], type(b.data.list).__name__, type(b.data.set).__name__
+            (True, False, 'DictObjectList', 'DictObjectSet')
+            >>> b.data.list[1].b = 5
+            >>> a.data.list[1].b, b.user_name
+            (2, 'Littlepip')
+            >>> b._attribute_to_key_map is a._attribute_to_key_map  # a shared map is shared, see SharedAttributeMaps
+            True
+            >>> c = copy.copy(a)
+            >>> c.data is a.data
+            True
+        """
+        return _copy_node(self, memo)
+    # end def
+
     def __getstate__(self):
-        return self.__dict__
+        state = dict(self.__dict__)
+        state.pop('_observer', None)  # weak references can't be pickled.
+        state.pop('_cow_epoch', None)  # the snapshots are of the original, see snapshot().
+        state.pop('_cow_history', None)
+        # a plain dict, as the shared ones can't be unpickled (they don't allow setting items).
+        state['_attribute_to_key_map'] = dict(self._attribute_to_key_map)
+        return state
     # end def
 
     def __setstate__(self, d):
@@ -856,11 +2634,628 @@ class DictObject(SomeDict):
         if isinstance(d, dict) and '_attribute_to_key_map' in d:
             self.__setattr__('_attribute_to_key_map', d['_attribute_to_key_map'])
             del d['_attribute_to_key_map']
+            shared_attribute_maps.share(self)
         # end if
         self.__dict__.update(d)
     # end def
 
 
+def _normalify_inplace(obj, memo):
+    """
+    DictObject.normalify(obj, inplace=True).
+
+    :param memo: id of the DictObjects and DictObjectLists already emptied: their plain version.
+                 The same one can be in the tree more than once (e.g. obj.attribute = ... stores the value for the
+                 attribute name and the key), or even in itself.
+    """
+    if isinstance(obj, (DictObject, DictObjectList)):
+        result = memo.get(id(obj))
+        if result is not None:
+            return result
+        # end if
+        if obj._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(obj)
+        # end if
+        if isinstance(obj, DictObject):
+            result = memo[id(obj)] = {}
+            for key, value in dict.items(obj):
+                result[key] = _normalify_inplace(value, memo)
+                dict.__setitem__(obj, key, None)  # drop the (now empty) DictObject right away.
+            # end for
+            dict.clear(obj)
+            obj._attribute_to_key_map = _EMPTY_ATTRIBUTE_MAP
+        else:
+            result = memo[id(obj)] = []
+            for i, value in enumerate(list.__iter__(obj)):
+                result.append(_normalify_inplace(value, memo))
+                list.__setitem__(obj, i, None)  # drop the (now empty) DictObject right away.
+            # end for
+            list.__delitem__(obj, slice(None))
+            if obj._indexes:
+                obj._invalidate_indexes()
+            # end if
+        # end if
+        return result
+    elif isinstance(obj, DictObjectSet):
+        return set(_normalify_inplace(x, memo) for x in set.__iter__(obj))
+    elif isinstance(obj, dict):
+        # Plain ones can be shared with the data a LazyDictObject was created from, so they are never changed.
+        # But if there is nothing to convert in them, they are used as they are.
+        result = obj
+        for key, value in obj.items():
+            new_value = _normalify_inplace(value, memo)
+            if new_value is not value:
+                if result is obj:
+                    result = dict(obj)
+                # end if
+                result[key] = new_value
+            # end if
+        # end for
+        return result
+    elif isinstance(obj, (list, tuple, set)):
+        values = [_normalify_inplace(x, memo) for x in obj]
+        if all(new is old for new, old in zip(values, obj)):
+            return obj
+        # end if
+        return type(obj)(values)
+    # end if
+    return obj
+# end def
+
+
+def _lazy_store(value):
+    """
+    Prepares a value to be stored in a lazy container.
+    Dicts and lists are kept as they are, as they can be objectified (and cached) when they are accessed.
+    Tuples and sets are immutable or unhashable-free, so there is nothing to cache them in later,
+    they are objectified right away, with their content being lazy.
+    """
+    if isinstance(value, (tuple, set)) and not isinstance(value, DictObjectSet):
+        return DictObject.objectify(value, lazy=True)
+    return value
+# end def
+
+
+def _lazy_wrap(value):
+    """
+    Objectifies a value stored in a lazy container, if it was not yet.
+    Returns the value unchanged if there is nothing to do.
+    """
+    if isinstance(value, dict) and not isinstance(value, DictObject):
+        return LazyDictObject(value)
+    elif isinstance(value, list) and not isinstance(value, DictObjectList):
+        return LazyDictObjectList(value)
+    return value
+# end def
+
+
+def _stored_before_snapshots(value):
+    """
+    A value objectified by a lazy container replaces the plain one, which snapshots taken before could have seen.
+    So it must save its content for them on the first change, like the plain one had been there all the time.
+    The same goes for the sets and tuples objectified right away with it (see _lazy_store()).
+    """
+    if isinstance(value, tuple):
+        children = value
+    elif isinstance(value, (FrozenDictObject, FrozenDictObjectList)) or not getattr(value, "_cow_epoch", 0):
+        return  # plain values, and the ones created before the snapshots anyway.
+    else:
+        value._cow_epoch = 0
+        if isinstance(value, dict):
+            children = dict.values(value)
+        elif isinstance(value, list):
+            children = list.__iter__(value)
+        else:
+            children = set.__iter__(value)
+        # end if
+    # end if
+    for child in children:
+        _stored_before_snapshots(child)
+    # end for
+# end def
+
+
+class LazyDictObject(DictObject):
+    """
+    A DictObject which stores nested dicts and lists as they are,
+    and only objectifies them when they are first accessed.
+    The objectified version is then cached, so the next access will get the same object.
+
+    Useful for big documents, where only a small part of the data is actually read.
+
+        >>> data = {"users": [{"name": "Littlepip", "friends": [{"name": "Velvet Remedy"}]}], "total": 1}
+        >>> lazy = LazyDictObject(data)
+        >>> lazy == data
+        True
+        >>> lazy.total
+        1
+        >>> type(dict.__getitem__(lazy, "users")) is list
+        True
+        >>> isinstance(lazy.users, LazyDictObjectList)
+        True
+        >>> lazy.users is lazy["users"]
+        True
+        >>> lazy.users[0].friends[0].name
+        'Velvet Remedy'
+        >>> isinstance(lazy.users[0], LazyDictObject)
+        True
+
+    Everything else behaves like the eager DictObject.
+
+        >>> DictObject.normalify(lazy) == DictObject.normalify(DictObject(data)) == data
+        True
+        >>> type(DictObject.normalify(lazy)["users"][0]) is dict
+        True
+        >>> lazy.total = {"count": 1}
+        >>> lazy.total.count
+        1
+        >>> [isinstance(v, DictObject) for k, v in sorted(lazy.items())]
+        [True, False]
+
+    Note, the nested values are not copied until they are accessed,
+    so changing the original data before will show up in the LazyDictObject as well.
+    """
+
+    def _add_to_object_part(self, name, obj):
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        dict.__setitem__(self, name, _lazy_store(obj))
+    # end def
+
+    def _objectify_stored(self, key, value):
+        wrapped = _lazy_wrap(value)
+        if wrapped is not value:
+            _stored_before_snapshots(wrapped)
+            dict.__setitem__(self, key, wrapped)
+            if self._observer is not None:
+                wrapped._observer = self._observer
+            # end if
+        # end if
+        return wrapped
+    # end def
+
+    def _objectify_all(self):
+        for key, value in list(dict.items(self)):
+            self._objectify_stored(key, value)
+        # end for
+    # end def
+
+    def __getitem__(self, key):
+        return self._objectify_stored(key, dict.__getitem__(self, key))
+    # end def
+
+    def get(self, key, default=None):
+        """
+        >>> LazyDictObject({"a": {"b": 1}}).get("a").b
+        1
+        >>> LazyDictObject().get("a", 2)
+        2
+        """
+        if dict.__contains__(self, key):
+            return self[key]
+        # end if
+        return default
+    # end def
+
+    def setdefault(self, key, default=None):
+        if not dict.__contains__(self, key):
+            self[key] = default
+        # end if
+        return self[key]
+    # end def
+
+    def pop(self, key, *default):
+        """
+        >>> isinstance(LazyDictObject({"a": {"b": 1}}).pop("a"), LazyDictObject)
+        True
+        """
+        return _lazy_wrap(super(LazyDictObject, self).pop(key, *default))
+    # end def
+
+    def popitem(self):
+        key, value = super(LazyDictObject, self).popitem()
+        return key, _lazy_wrap(value)
+    # end def
+
+    def values(self):
+        self._objectify_all()
+        return dict.values(self)
+    # end def
+
+    def items(self):
+        self._objectify_all()
+        return dict.items(self)
+    # end def
+
+    def copy(self):
+        self._objectify_all()
+        return dict.copy(self)
+    # end def
+# end class
+
+
+class LazyDictObjectList(DictObjectList):
+    """
+    A DictObjectList which stores nested dicts and lists as they are,
+    and only objectifies them when they are first accessed.
+    See LazyDictObject.
+
+        >>> l = LazyDictObjectList([{"a": 1}, [2, 3], 4])
+        >>> l == [{"a": 1}, [2, 3], 4]
+        True
+        >>> type(list.__getitem__(l, 0)) is dict
+        True
+        >>> l[0].a
+        1
+        >>> isinstance(list.__getitem__(l, 0), LazyDictObject)
+        True
+        >>> [type(x).__name__ for x in l]
+        ['LazyDictObject', 'LazyDictObjectList', 'int']
+        >>> l.append({"b": 5})
+        >>> l[-1].b
+        5
+        >>> l[1:]
+        [[2, 3], 4, {'b': 5}]
+        >>> isinstance(l[1:][0], DictObjectList)
+        True
+        >>> l.pop().b
+        5
+
+    An index (see DictObjectList.create_index()) objectifies all the records.
+
+        >>> l = LazyDictObjectList([{"id": 1}, {"id": 2}])
+        >>> _ = l.create_index("id", unique=True)
+        >>> l.append({"id": 3})
+        >>> l.find(id=3) is l[2], l.pop(0).id, l.find(id=1)
+        (True, 1, None)
+    """
+
+    def __init__(self, iterable=None):
+        list.__init__(self, (_lazy_store(x) for x in (iterable or ())))
+        if _snapshots.epoch and _snapshots.live:
+            self._cow_epoch = _snapshots.epoch  # no snapshot can have seen it before.
+        # end if
+    # end def __init__
+
+    def _objectify_stored(self, index, value):
+        wrapped = _lazy_wrap(value)
+        if wrapped is not value:
+            _stored_before_snapshots(wrapped)
+            list.__setitem__(self, index, wrapped)
+            if self._observer is not None:
+                wrapped._observer = self._observer
+            # end if
+        # end if
+        return wrapped
+    # end def
+
+    def _objectify_all(self):
+        for i, value in enumerate(list.__iter__(self)):
+            self._objectify_stored(i, value)
+        # end for
+    # end def
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            for i in range(*index.indices(len(self))):
+                self._objectify_stored(i, list.__getitem__(self, i))
+            # end for
+            return list.__getitem__(self, index)
+        # end if
+        return self._objectify_stored(index, list.__getitem__(self, index))
+    # end def
+
+    def __iter__(self):
+        i = 0
+        while i < len(self):
+            yield self[i]
+            i += 1
+        # end while
+    # end def
+
+    def __reversed__(self):
+        i = len(self) - 1
+        while i >= 0:
+            yield self[i]
+            i -= 1
+        # end while
+    # end def
+
+    def insert(self, index, value):
+        if self._indexes:  # keeps the records, so they must not be wrapped later.
+            return DictObjectList.insert(self, index, value)
+        # end if
+        value = _lazy_store(value)
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        list.insert(self, index, value)
+        if self._observer is not None:
+            _observed_change(self, value)
+        # end if
+    # end def
+
+    def append(self, value):
+        if self._indexes:  # keeps the records, so they must not be wrapped later.
+            return DictObjectList.append(self, value)
+        # end if
+        value = _lazy_store(value)
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        list.append(self, value)
+        if self._observer is not None:
+            _observed_change(self, value)
+        # end if
+    # end def
+
+    def extend(self, values):
+        if self._indexes:  # keeps the records, so they must not be wrapped later.
+            return DictObjectList.extend(self, values)
+        # end if
+        values = [_lazy_store(x) for x in values]
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        list.extend(self, values)
+        if self._observer is not None:
+            _observed_change(self, tuple(values))
+        # end if
+    # end def
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+    # end def
+
+    def __setitem__(self, index, value):
+        if self._indexes:  # keeps the records, so they must not be wrapped later.
+            return DictObjectList.__setitem__(self, index, value)
+        # end if
+        if isinstance(index, slice):
+            value = [_lazy_store(x) for x in value]
+        else:
+            value = _lazy_store(value)
+        # end if
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        list.__setitem__(self, index, value)
+        if self._observer is not None:
+            _observed_change(self, tuple(value) if isinstance(index, slice) else value)
+        # end if
+    # end def
+
+    def pop(self, *index):
+        if self._indexes:
+            return DictObjectList.pop(self, *index)
+        # end if
+        if self._cow_epoch != _snapshots.epoch:
+            _save_for_snapshots(self)
+        # end if
+        value = _lazy_wrap(list.pop(self, *index))
+        if self._observer is not None:
+            _observed_change(self)
+        # end if
+        return value
+    # end def
+
+    def create_index(self, fields, unique=False):
+        self._objectify_all()  # the index keeps the records, so they have to be the final objects already.
+        return super(LazyDictObjectList, self).create_index(fields, unique=unique)
+    # end def
+
+    def copy(self):
+        self._objectify_all()
+        return list(list.__iter__(self))
+    # end def
+
+    def sort(self, *args, **kwargs):
+        self._objectify_all()
+        super(LazyDictObjectList, self).sort(*args, **kwargs)
+    # end def
+
+    def __add__(self, other):
+        self._objectify_all()
+        return list.__add__(self, other)
+    # end def
+# end class
+
+
+_IMMUTABLE_LEAVES = frozenset((type(None), bool, int, float, complex, str, bytes, type(u""), type(2 ** 64)))
+_NOT_COPIED = frozenset(("_observer", "_cow_epoch", "_cow_history", "_indexes"))  # they belong to the original.
+_object_getstate = getattr(object, "__getstate__", None)  # python 3.11+
+
+
+def _instance_dict(obj):
+    """
+    :return: The `__dict__` of obj, or None if it has none. Without creating an empty one, if possible (python 3.11+).
+    """
+    if _object_getstate is not None:
+        state = _object_getstate(obj)
+        return state[0] if isinstance(state, tuple) else state  # (dict, slots) with __slots__
+    # end if
+    return getattr(obj, "__dict__", None)
+# end def
+
+
+def _copy_node(obj, memo=None):
+    """
+    Copies a DictObject, DictObjectList or DictObjectSet (or a plain dict or list stored in a lazy one) directly,
+    instead of rebuilding it with __reduce_ex__() and __setstate__(). Used by their __copy__() and __deepcopy__().
+    The attribute map is shared if it is a shared one (see SharedAttributeMaps), else copied.
+
+    :param memo: The memo of copy.deepcopy(), or None for a shallow copy.
+    """
+    cls = type(obj)
+    copied = cls.__new__(cls)
+    if memo is not None:
+        memo[id(obj)] = copied
+        memo.setdefault(id(memo), []).append(obj)  # keeps it alive, so its id isn't reused, like copy.deepcopy().
+    # end if
+    leaves = _IMMUTABLE_LEAVES
+    if isinstance(obj, dict):
+        if isinstance(obj, DictObject):
+            attribute_map = obj._attribute_to_key_map
+            if not isinstance(attribute_map, _SharedAttributeMap):
+                attribute_map = dict(attribute_map)
+            # end if
+            dict.__setattr__(copied, "_attribute_to_key_map", attribute_map)
+        # end if
+        if memo is None:
+            dict.update(copied, obj)
+        else:
+            for key, value in dict.items(obj):
+                dict.__setitem__(copied, key, value if type(value) in leaves else _deepcopy_value(value, memo))
+            # end for
+        # end if
+    elif isinstance(obj, list):
+        if memo is None:
+            list.extend(copied, list.__iter__(obj))
+        else:
+            list.extend(copied, [
+                value if type(value) in leaves else _deepcopy_value(value, memo) for value in list.__iter__(obj)
+            ])
+        # end if
+    else:
+        if memo is None:
+            set.update(copied, set.__iter__(obj))
+        else:
+            set.update(copied, [
+                value if type(value) in leaves else _deepcopy_value(value, memo) for value in set.__iter__(obj)
+            ])
+        # end if
+    # end if
+    state = _instance_dict(obj)
+    if state:
+        for name, value in state.items():
+            if name not in _NOT_COPIED:
+                copied.__dict__[name] = value if memo is None else copy.deepcopy(value, memo)
+            # end if
+        # end for
+    # end if
+    return copied
+# end def
+
+
+def _deepcopy_value(value, memo):
+    """
+    copy.deepcopy(value, memo), but without the detour for the containers _copy_node() can copy directly.
+    """
+    copied = memo.get(id(value), _NOT_FOUND)
+    if copied is not _NOT_FOUND:
+        return copied
+    # end if
+    if type(value) in _COPIED_DIRECTLY:
+        return _copy_node(value, memo)
+    # end if
+    return copy.deepcopy(value, memo)
+# end def
+
+
+_COPIED_DIRECTLY = frozenset((dict, list, DictObject, DictObjectList, DictObjectSet, LazyDictObject, LazyDictObjectList))
+
+
+def _cached_hash(value):
+    """
+    :return: The hash of a FrozenDictObject(List), if it already has been calculated. Else None.
+    """
+    if isinstance(value, (FrozenDictObject, FrozenDictObjectList)):
+        return value._hash
+    # end if
+    return None
+# end def
+
+
+def _diff(old, new, path, ops):
+    """
+    Adds the operations to change `old` into `new` to `ops`, see DictObject.diff().
+
+    :param path: The list of keys to `old`.
+    """
+    if old is new:
+        return
+    # end if
+    old_hash = _cached_hash(old)
+    if old_hash is not None:
+        new_hash = _cached_hash(new)
+        # A different hash means it changed. The same one is very likely equal, but that still has to be checked.
+        if old_hash == new_hash and old == new:
+            return
+        # end if
+    # end if
+    if isinstance(old, Mapping) and isinstance(new, Mapping):
+        for key in old:
+            if new.get(key, _NOT_FOUND) is _NOT_FOUND:
+                ops.append({"op": "del", "path": path + [key]})
+            # end if
+        # end for
+        for key, value in new.items():
+            old_value = old.get(key, _NOT_FOUND)
+            if old_value is _NOT_FOUND:
+                ops.append({"op": "set", "path": path + [key], "value": _patch_value(value)})
+            else:
+                _diff(old_value, value, path + [key], ops)
+            # end if
+        # end for
+        return
+    # end if
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+        common = min(len(old), len(new))
+        for i in range(common):
+            _diff(old[i], new[i], path + [i], ops)
+        # end for
+        for i in range(len(old) - 1, common - 1, -1):  # from the end, so the indexes stay the same.
+            ops.append({"op": "del", "path": path + [i]})
+        # end for
+        for i in range(common, len(new)):
+            ops.append({"op": "set", "path": path + [i], "value": _patch_value(new[i])})
+        # end for
+        return
+    # end if
+    if isinstance(old, (set, frozenset)) and isinstance(new, (set, frozenset)):
+        if old != new:  # DictObjectSet, set and frozenset are equal with the same elements.
+            ops.append({"op": "set", "path": path, "value": _patch_value(new)})
+        # end if
+        return
+    # end if
+    if type(old) is not type(new) or old != new:  # 1 == 1.0 == True, but not in json.
+        ops.append({"op": "set", "path": path, "value": _patch_value(new)})
+    # end if
+# end def
+
+
+def _patch_value(value):
+    """
+    The value of a "set" operation of DictObject.diff(): Like DictObject.normalify(), but with sets as lists,
+    so it can be stored or sent as json.
+    """
+    if isinstance(value, dict):
+        return {key: _patch_value(x) for key, x in dict.items(value)}  # the stored values, lazy ones stay plain.
+    elif isinstance(value, list):
+        return [_patch_value(x) for x in list.__iter__(value)]
+    elif isinstance(value, tuple):
+        return tuple(_patch_value(x) for x in value)
+    elif isinstance(value, (set, frozenset, DictObjectListSnapshot)):
+        return [_patch_value(x) for x in value]
+    elif isinstance(value, Mapping):  # e.g. a DictObjectSnapshot
+        return {key: _patch_value(x) for key, x in value.items()}
+    # end if
+    return value
+# end def
+
+
+# The bigger features are in their own modules. They need the classes above, so they are imported last.
+from .frozen import FrozenDictObject, FrozenDictObjectList, _freeze
+from .index import DictObjectListIndex
+from .records import DictObjectRecord, _create_record_type, _record_types
+from .columnar import ColumnarDictObjectList, _columns_to_numpy, _import_numpy
+from .snapshot import DictObjectSnapshot, DictObjectListSnapshot, _SnapshotToken
+from .path import DictObjectPath, _compiled_paths
+from .streaming import _StreamingJSONLoader
+
+
 def ______do_more_doctests______():
     """
     For test suite, so we don't spam it in one of the classes.
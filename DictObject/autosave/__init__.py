@@ -1,17 +1,141 @@
 try:
-    from .. import DictObject
+    from .. import DictObject, _set_observer, _json_default, _save_for_snapshots, _snapshots
 except (ImportError, ValueError):
-    from DictObject import DictObject, DictObjectList
-    from luckydonaldUtils.encoding import to_native as n
+    from DictObject import DictObject, DictObjectList, _set_observer, _json_default, _save_for_snapshots, _snapshots
 # end try
+from luckydonaldUtils.encoding import to_native as n
 import os
+import copy
 import json
+import stat
+import time
+import uuid
+import errno
+import atexit
+import weakref
 import logging
+import itertools
+import contextlib
+try:
+    from collections.abc import KeysView  # python 3
+except ImportError:
+    from collections import KeysView  # py2
+# end try
 
 __author__ = 'luckydonald'
 
 logger = logging.getLogger(__name__)
 
+_objects_with_unsaved_changes = {}  # id(obj): obj, so they are written at exit, even if there are no other references.
+
+
+_replace_file = getattr(os, "replace", os.rename)  # python 2 has no os.replace, but rename replaces on posix too.
+
+
+def _fsync_folder(folder):
+    """
+    Makes sure a rename in that folder is on disk. Only possible on posix, on windows this does nothing.
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    # end if
+    fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    # end try
+# end def
+
+
+def write_file_atomic(path, data):
+    """
+    Writes the string to the file, in a way that the file always has either the old or the new content,
+    even if the process gets killed or the computer crashes while writing.
+
+    The data is written into a temporary file in the same folder, synced to disk,
+    and then renamed to replace the actual file. Missing folders are created.
+
+        >>> write_file_atomic("./atomic/test.json", '{"works": true}')
+        >>> with open("./atomic/test.json") as f:
+        ...     f.read()
+        '{"works": true}'
+        >>> os.listdir("./atomic")
+        ['test.json']
+
+    If writing fails, the old file stays as it was, and the temporary file is removed:
+
+        >>> write_file_atomic("./atomic/test.json", object())  # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+            ...
+        TypeError: can't write an object
+        >>> with open("./atomic/test.json") as f:
+        ...     f.read()
+        '{"works": true}'
+        >>> os.listdir("./atomic")
+        ['test.json']
+        >>> import shutil; shutil.rmtree("./atomic")
+
+    :param path: The file to write.
+    :param data: The string to write into it.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    temp_path = "{path}.{id}.tmp".format(path=path, id=uuid.uuid4().hex[:12])
+    try:
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        # end if
+        # So we don't have to check if the folder exists before every single write.
+        try:
+            os.makedirs(folder)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            # end if
+            # Another process (or thread) created the folder in the meantime, that's fine.
+        # end try
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    # end try
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        # end with
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))  # keep the permissions of the old file.
+        except OSError:
+            pass  # new file
+        # end try
+        _replace_file(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        # end try
+        raise
+    # end try
+    _fsync_folder(folder)
+# end def
+
+
+@atexit.register
+def _store_unsaved_changes():
+    """
+    Writes the AutosaveDictObjects with pending (coalesced) changes to disk at interpreter exit.
+    """
+    for obj in list(_objects_with_unsaved_changes.values()):
+        try:
+            obj.flush()
+        except Exception:
+            logger.exception("Could not save unsaved changes to {path}.".format(path=obj._database_file))
+        # end try
+    # end for
+# end def
+
 
 class AutosaveDictObject(DictObject):
     """
@@ -84,9 +208,120 @@ class AutosaveDictObject(DictObject):
             True
             >>> os.remove("./test2.json")
 
+        Writing the whole file on every change gets slow, if there are a lot of them.
+        With `save_interval` it is written at most once in that many seconds,
+        with `max_unsaved_changes` only every that many changes.
+        The remaining changes are written by flush(), close(), when leaving a `with` block, and at interpreter exit.
+        There is no background thread (it would write while you change the data), so the interval is only checked
+        on the next change: Changes followed by none for a while stay unsaved until then, and are lost on a crash.
+        Call flush() when you are done with a bunch of changes, e.g. before waiting for the next request.
+
+            >>> with AutosaveDictObject("./test3.json", load_now=False, save_interval=60) as e:
+            ...     e.counter = 0  # first change is written right away
+            ...     for i in range(1000):
+            ...         e.counter += 1  # those are not
+            ...     AutosaveDictObject("./test3.json").counter
+            0
+            >>> AutosaveDictObject("./test3.json").counter  # the with block wrote it.
+            1000
+
+            >>> f = AutosaveDictObject("./test3.json", max_unsaved_changes=2)
+            >>> f.a = 1
+            >>> "a" in AutosaveDictObject("./test3.json")
+            False
+            >>> f.b = 2
+            >>> AutosaveDictObject("./test3.json") == {"counter": 1000, "a": 1, "b": 2}
+            True
+            >>> del f.a
+            >>> f.flush()
+            >>> AutosaveDictObject("./test3.json") == {"counter": 1000, "b": 2}
+            True
+            >>> os.remove("./test3.json")
+
+        To change a lot of values at once, use a batch, which writes only once at the end.
+        Batches can be nested, only leaving the outermost one writes.
+
+            >>> g = AutosaveDictObject("./test4.json", load_now=False)
+            >>> with g.batch():
+            ...     g.a = 1
+            ...     with g.batch():
+            ...         g.b = 2
+            ...     g.c = 3
+            ...     os.path.exists("./test4.json")
+            False
+            >>> AutosaveDictObject("./test4.json") == {"a": 1, "b": 2, "c": 3}
+            True
+
+        With `rollback=True` the changes are undone if the block raises an exception, and nothing is written.
+
+            >>> with g.batch(rollback=True):
+            ...     g.a = "changed"
+            ...     del g.b
+            ...     g.c = {"new": "value"}
+            ...     raise ValueError("Something went wrong")
+            Traceback (most recent call last):
+                ...
+            ValueError: Something went wrong
+            >>> g == {"a": 1, "b": 2, "c": 3}
+            True
+            >>> g.b
+            2
+            >>> AutosaveDictObject("./test4.json") == {"a": 1, "b": 2, "c": 3}
+            True
+
+        Changes deeper in the data are noticed as well, so they are saved too.
+        (A nested value which was replaced or deleted still notifies it, which only results in an unneeded write.)
+
+            >>> g.c = {"settings": {"timeout": 1}, "list": [{"foo": "bar"}]}
+            >>> g.c.settings.timeout = 5
+            >>> g.c.list.append({"new": "item"})
+            >>> g.c.list[1].new = "changed"
+            >>> h = AutosaveDictObject("./test4.json")
+            >>> h.c.settings.timeout, h.c.list
+            (5, [{'foo': 'bar'}, {'new': 'changed'}])
+            >>> with g.batch():  # still only writes once
+            ...     for i in range(100):
+            ...         g.c.list.append(i)
+            >>> len(AutosaveDictObject("./test4.json").c.list)
+            102
+
+            That includes all the methods changing them, like sort() or pop():
 
+            >>> g.c = {"numbers": [3, 1, 2], "tags": {"a"}, "more": {"x": 1, "y": 2}}
+            >>> g.c.numbers.sort()
+            >>> g.c.tags |= {"b"}
+            >>> g.c.more.pop("x")
+            1
+            >>> g.c.more.setdefault("z", 3)
+            3
+            >>> h = AutosaveDictObject("./test4.json")
+            >>> h.c.numbers, sorted(h.c.tags), h.c.more == {"y": 2, "z": 3}
+            ([1, 2, 3], ['a', 'b'], True)
+            >>> os.remove("./test4.json")
+
+        The file is written as compact json, with the keys in insertion order.
+        For human readable files, set `json_indent` and `json_sort_keys` in a subclass.
+        (Not on the instance, that would store them as data.)
+
+            >>> class ReadableAutosaveDictObject(AutosaveDictObject):
+            ...     json_indent = 2
+            ...     json_sort_keys = True
+            >>> g = ReadableAutosaveDictObject("./test4.json", load_now=False)
+            >>> g.b, g.a = 2, 1
+            >>> print(open("./test4.json").read())
+            {
+              "a": 1,
+              "b": 2
+            }
+            >>> os.remove("./test4.json")
     """
-    def __init__(self, file, autosafe=True, path=None, load_now=True, defaults=None, *args, **kwargs):
+    json_indent = None  # See DictObject.to_json()
+    json_sort_keys = False
+
+    def __init__(
+        self, file, autosafe=True, path=None, load_now=True, defaults=None, save_interval=None, max_unsaved_changes=None,
+        *args, **kwargs
+    ):
         """
         Initializes the object.
 
@@ -95,14 +330,24 @@ class AutosaveDictObject(DictObject):
         :param path: The path of the folder where the file is in. Default: None
         :param load_now: If it should load the data from said fail upon creation. Default: True
         :param defaults: Some default dictionary values it should be initialized with. Note that overwrites **kwargs, but not the stuff loaded from file. Default: None
+        :param save_interval: Write changes at most every that many seconds, instead of on every change.
+                              Checked on every change only, see flush(). Default: None
+        :param max_unsaved_changes: Write changes only every that many changes, instead of on every change. Default: None
         """
-        self.__init_constructor__(autosafe, defaults, file, load_now, path, args, kwargs)
+        self.__init_constructor__(autosafe, defaults, file, load_now, path, args, kwargs, save_interval, max_unsaved_changes)
     # end def
     # end if
 
-    def __init_constructor__(self, autosafe, defaults, file, load_now, path, args, kwargs):
+    def __init_constructor__(
+        self, autosafe, defaults, file, load_now, path, args, kwargs, save_interval=None, max_unsaved_changes=None
+    ):
         if path:
             file = os.path.join(path, file)
+        self._save_interval = save_interval
+        self._max_unsaved_changes = max_unsaved_changes
+        self._unsaved_changes = 0
+        self._last_save = None
+        self._batch_depth = 0
         super(AutosaveDictObject, self).__init__(*args, **kwargs)
         if defaults:
             if isinstance(defaults, dict):
@@ -123,13 +368,125 @@ class AutosaveDictObject(DictObject):
             except (ValueError, TypeError, Exception):
                 raise
 
+    def _add_to_object_part(self, name, obj):
+        super(AutosaveDictObject, self)._add_to_object_part(name, obj)
+        # get notified about changes of nested values, too.
+        _set_observer(dict.__getitem__(self, name), (weakref.ref(self), name))
+    # end def
+
+    def _nested_changed(self, key):
+        """
+        Called when a value nested somewhere in `self[key]` was changed.
+        """
+        self._changed()
+    # end def
+
     def after_set(self, key, value_to_set):
-        if self._autosafe:
+        self._changed()
+        # super(AutosaveDictObject, self).after_set()
+    # end def
+
+    def after_del(self, key):
+        self._changed()
+    # end def
+
+    def _changed(self):
+        """
+        Called after every change. Writes to disk if autosave is on, and the save_interval/max_unsaved_changes allow it.
+        """
+        self._unsaved_changes += 1
+        if not self._autosafe or self._batch_depth:
+            return
+        # end if
+        if self._save_interval is None and self._max_unsaved_changes is None:
+            self.store_database()  # every change.
+        elif self._max_unsaved_changes is not None and self._unsaved_changes >= self._max_unsaved_changes:
+            self.store_database()
+        elif self._save_interval is not None and (
+            self._last_save is None or time.time() - self._last_save >= self._save_interval
+        ):
+            self.store_database()
+        else:
+            _objects_with_unsaved_changes[id(self)] = self  # make sure it gets written at exit.
+        # end if
+    # end def
+
+    @contextlib.contextmanager
+    def batch(self, rollback=False):
+        """
+        Context manager to change a lot of values at once, without writing to disk after every single change.
+        It writes once when the outermost batch ends (if autosave is on).
+
+        :param rollback: If the changes done in the batch should be undone, in case it raises an exception.
+                         Note that this makes a (deep) copy of the data first. Nested objects are restored as copies,
+                         so old references to them are no longer part of this object.
+        """
+        backup = None
+        if rollback:
+            changed_keys = getattr(self, "_changed_keys", None)  # see _PerKeyAutosaveDictObject
+            backup = (
+                copy.deepcopy(dict(self)), dict(self._attribute_to_key_map), self._unsaved_changes,
+                None if changed_keys is None else dict(changed_keys), self._last_save,
+            )
+        # end if
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if backup is not None:
+                data, attribute_to_key_map, unsaved_changes, changed_keys, last_save = backup
+                keys_in_batch = list(dict.keys(self))
+                DictObject.clear(self)  # not dict.clear(), so snapshots (see DictObject.snapshot()) keep the data.
+                for key, value in data.items():
+                    self._add_to_object_part(key, value)  # instead of dict.update(), to observe the nested values again.
+                # end for
+                self._attribute_to_key_map = attribute_to_key_map
+                self._unsaved_changes = unsaved_changes
+                if changed_keys is not None:
+                    self._changed_keys = changed_keys
+                # end if
+                if self._last_save != last_save:
+                    # It was saved (flush()) in the batch, so the file has changes which are undone now.
+                    self._unsaved_changes += 1
+                    if changed_keys is not None:
+                        changed_keys.update(dict.fromkeys(keys_in_batch))
+                        changed_keys.update(dict.fromkeys(data))
+                    # end if
+                # end if
+            # end if
+            raise
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._autosafe:
+                self.flush()
+            # end if
+        # end try
+    # end def
+
+    def flush(self):
+        """
+        Writes to disk, if there are changes not written yet.
+        """
+        if self._unsaved_changes:
             self.store_database()
-            # super(AutosaveDictObject, self).after_set()
         # end if
     # end def
 
+    def close(self):
+        """
+        Writes the not yet written changes to disk.
+        """
+        self.flush()
+    # end def
+
+    def __enter__(self):
+        return self
+    # end def
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    # end def
+
     @staticmethod
     def _parse_object(instance):
         if hasattr(instance, "as_dict"):
@@ -140,9 +497,7 @@ class AutosaveDictObject(DictObject):
     # end def
 
     def _json_to_str(self):
-        # self still is a dict.
-        return json.dumps(self, sort_keys=True, indent=4, separators=(',', ': '),
-                                 default=self._parse_object)
+        return self.to_json(indent=self.json_indent, sort_keys=self.json_sort_keys)
     # end def
 
     def _str_to_json(self, json_data):
@@ -150,29 +505,699 @@ class AutosaveDictObject(DictObject):
     # end def
 
     def store_database(self):
+        """
+        Writes the data to the file.
+        This is atomic (see write_file_atomic), a crash while writing leaves the old file in place.
+
+        Let's kill a process while it writes. It has the new data in the temporary file already,
+        but dies before that replaces the actual file.
+
+            >>> a = AutosaveDictObject("./test5.json", load_now=False)
+            >>> a.state = "old"
+            >>> import subprocess, sys
+            >>> code = '\\n'.join([
+            ...     'import os, signal',
+            ...     'from DictObject.autosave import AutosaveDictObject',
+            ...     'a = AutosaveDictObject("./test5.json")',
+            ...     'os.fsync = lambda fd: os.kill(os.getpid(), getattr(signal, "SIGKILL", signal.SIGTERM))',
+            ...     'a.state = "new"',
+            ...     'print("not killed")',
+            ... ])
+            >>> env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+            >>> process = subprocess.Popen([sys.executable, "-c", code], env=env, stdout=subprocess.PIPE)
+            >>> not process.communicate()[0]  # so it never printed "not killed".
+            True
+            >>> process.returncode != 0
+            True
+            >>> AutosaveDictObject("./test5.json").state
+            'old'
+            >>> [f for f in os.listdir(".") if f.startswith("test5.json")] != ["test5.json"]  # the temporary file is left
+            True
+            >>> for f in os.listdir("."):
+            ...     if f.startswith("test5.json"):
+            ...         os.remove(f)
+        """
         logger.debug("Saving AutosaveDictObject to {path}.".format(path=self._database_file))
         json_string = self._json_to_str()
-        if not os.path.exists(os.path.dirname(self._database_file)):
-            os.makedirs(os.path.dirname(self._database_file))
-        with open(self._database_file, "w") as file:  # TODO: create folder.
-            file.write(json_string)
-            file.flush()
+        write_file_atomic(self._database_file, json_string)
+        self._saved()
         logger.debug("Saved AutosaveDictObject to {path}".format(path=self._database_file))
 
+    def _saved(self):
+        """
+        Call after everything got written to disk.
+        """
+        self._unsaved_changes = 0
+        self._last_save = time.time()
+        _objects_with_unsaved_changes.pop(id(self), None)
+    # end def
+
     def enable_autosave(self, boolean=True):
         self._autosafe = boolean
 
     def load_database(self, merge=False):
         logger.debug("Loading database from {file}.".format(file=self._database_file))
         with open(self._database_file, "r") as file:
-            json_data = file.read()
+            data = DictObject.load(file)  # builds the DictObjects while reading, without the whole text in memory.
         # end with
-        data = self._str_to_json(json_data)
         if not merge:
             logging.debug("Not merging.")
-            self._attribute_to_key_map.clear()
-            self.clear()
+            self.clear()  # DictObject.__init__ starts with a new _attribute_to_key_map.
             DictObject.__init__(self, data)
         else:
             logging.debug("Merging data.")
             self.merge_dict(data)
+
+
+def _json_key(key):
+    """
+    The string json uses for a dict key, so the journal uses the same keys as the snapshot file.
+    """
+    if isinstance(key, (str, type(u""))):
+        return key
+    # end if
+    return json.dumps(key)  # 1 -> "1", True -> "true", None -> "null", like json does for keys.
+# end def
+
+
+class _PerKeyAutosaveDictObject(AutosaveDictObject):
+    """
+    Base for the AutosaveDictObjects which write only the changed top level keys, instead of the whole data.
+    It collects the keys changed since the last save in `_changed_keys`.
+    """
+    def __init_constructor__(self, *args, **kwargs):
+        self._changed_keys = {}  # key: None. Used as ordered set.
+        self._is_loading = False
+        super(_PerKeyAutosaveDictObject, self).__init_constructor__(*args, **kwargs)
+    # end def
+
+    @contextlib.contextmanager
+    def _loading(self):
+        """
+        Data merged while this is active comes from disk, so it is not marked as changed.
+        """
+        was_loading, self._is_loading = self._is_loading, True
+        try:
+            yield
+        finally:
+            self._is_loading = was_loading
+        # end try
+    # end def
+
+    def _mark_changed(self, key):
+        self._changed_keys[key] = None
+        key_name = self._attribute_to_key_map.get(key, key)  # obj.attribute = ... sets the original key as well.
+        if key_name != key:
+            self._changed_keys[key_name] = None
+        # end if
+    # end def
+
+    def _nested_changed(self, key):
+        self._mark_changed(key)
+        self._changed()
+    # end def
+
+    def after_set(self, key, value_to_set):
+        self._mark_changed(key)
+        self._changed()
+    # end def
+
+    def after_del(self, key):
+        self._changed_keys[key] = None
+        self._changed()
+    # end def
+
+    def merge_dict(self, d):
+        # The whole file variant writes merged data (e.g. the defaults) with the next save, so do we.
+        super(_PerKeyAutosaveDictObject, self).merge_dict(d)
+        if not self._is_loading:
+            self._changed_keys.update(dict.fromkeys(d))
+            self._unsaved_changes += 1  # so flush() writes it.
+        # end if
+        return self
+    # end def
+
+    def clear(self):
+        if not self._is_loading:
+            self._changed_keys.update(dict.fromkeys(dict.keys(self)))
+            self._unsaved_changes += 1  # so flush() writes it.
+        # end if
+        super(_PerKeyAutosaveDictObject, self).clear()
+    # end def
+# end class
+
+
+class JournalAutosaveDictObject(_PerKeyAutosaveDictObject):
+    """
+    An AutosaveDictObject, which doesn't rewrite the whole file on every change.
+    Instead, every change is appended as one line to a journal file next to it (`<file>.journal`),
+    so the cost of saving only depends on the size of the change, not of the whole document.
+    A record holds the whole value of the top level key which changed, so `a.settings.timeout = 5` writes all of
+    `a.settings` again. Data which changes often is best spread over many small top level keys.
+
+    Loading reads the file (snapshot) and replays the journal.
+    Once the journal gets bigger than `compact_ratio` times the snapshot (and at least `compact_min_size` bytes),
+    it is compacted: The snapshot is written again with all the data, and the journal is emptied.
+
+    It takes the same arguments as AutosaveDictObject, and the coalescing (save_interval, max_unsaved_changes),
+    flush(), close() and batch() work the same.
+
+        >>> a = JournalAutosaveDictObject("./test6.json", load_now=False)
+        >>> a.foo = "bar"
+        >>> a["big"] = list(range(100))
+        >>> a.foo = "changed"
+        >>> del a["big"]
+        >>> os.path.exists("./test6.json")  # no snapshot yet
+        False
+        >>> with open("./test6.json.journal") as f:
+        ...     [json.loads(line)["op"] for line in f]
+        ['set', 'set', 'set', 'del']
+        >>> b = JournalAutosaveDictObject("./test6.json")
+        >>> b == {"foo": "changed"}
+        True
+
+        Changes which are not written yet are coalesced, so only the last value of a key gets written:
+
+        >>> with b.batch():
+        ...     for i in range(100):
+        ...         b.counter = i
+        >>> with open("./test6.json.journal") as f:
+        ...     len(f.readlines())
+        5
+        >>> b.compact()
+        >>> os.path.getsize("./test6.json.journal")
+        0
+        >>> JournalAutosaveDictObject("./test6.json") == {"foo": "changed", "counter": 99}
+        True
+        >>> b.nested = {"list": []}
+        >>> b.nested.list.append(1)
+        >>> JournalAutosaveDictObject("./test6.json").nested
+        {'list': [1]}
+
+        A batch which is rolled back doesn't leave changed keys behind, so those are not written:
+
+        >>> try:
+        ...     with b.batch(rollback=True):
+        ...         b.foo = "rolled back"
+        ...         raise ValueError()
+        ... except ValueError:
+        ...     pass
+        >>> b.foo, list(b._changed_keys)
+        ('changed', [])
+
+        A line which was only partly written, because the process crashed, is ignored.
+        The next change is written on a new line, not appended to the broken one:
+
+        >>> with open("./test6.json.journal", "a") as f:
+        ...     _ = f.write('{"op": "set", "path": ["foo"], "value": "half writt')
+        >>> e = JournalAutosaveDictObject("./test6.json")
+        >>> e.foo
+        'changed'
+        >>> e.c = 3
+        >>> e.close()
+        >>> e = JournalAutosaveDictObject("./test6.json")
+        >>> e.foo, e.c
+        ('changed', 3)
+
+        With `load_now=False` the existing data is overwritten, like with AutosaveDictObject.
+        Sets are stored as lists:
+
+        >>> c = JournalAutosaveDictObject("./test6.json", load_now=False)
+        >>> c.tags = {"new"}
+        >>> JournalAutosaveDictObject("./test6.json") == {"tags": ["new"]}
+        True
+        >>> os.remove("./test6.json")
+        >>> os.remove("./test6.json.journal")
+    """
+    def __init__(
+        self, file, autosafe=True, path=None, load_now=True, defaults=None, save_interval=None, max_unsaved_changes=None,
+        compact_ratio=1.0, compact_min_size=65536, *args, **kwargs
+    ):
+        """
+        Initializes the object.
+
+        See AutosaveDictObject for the other parameters.
+        :param compact_ratio: Compact, when the journal is that many times bigger than the snapshot. Default: 1.0
+        :param compact_min_size: But only compact, when the journal is at least that many bytes big. Default: 65536
+        """
+        self._compact_ratio = compact_ratio
+        self._compact_min_size = compact_min_size
+        self._journal_size = None  # not read yet
+        self._journal_ends_with_newline = True  # False if the last line was only partly written.
+        self._snapshot_size = 0
+        self.__init_constructor__(autosafe, defaults, file, load_now, path, args, kwargs, save_interval, max_unsaved_changes)
+    # end def
+
+    @property
+    def _journal_file(self):
+        return self._database_file + ".journal"
+    # end def
+
+    def _journal_lines(self):
+        """
+        The journal records for all the changed keys, with their current value.
+        """
+        for key in self._changed_keys:
+            if dict.__contains__(self, key):
+                record = {"op": "set", "path": [_json_key(key)], "value": dict.__getitem__(self, key)}
+            else:
+                record = {"op": "del", "path": [_json_key(key)]}
+            # end if
+            yield json.dumps(record, separators=(',', ':'), default=_json_default) + "\n"
+        # end for
+    # end def
+
+    def store_database(self):
+        """
+        Appends the changes to the journal, or compacts it if it got too big.
+        If it was never loaded (`load_now=False`), the first store compacts, to overwrite the existing files,
+        like AutosaveDictObject does. Otherwise the old journal would be replayed on top of the data.
+        """
+        if self._journal_size is None:
+            if not os.path.exists(self._database_file) and not os.path.exists(self._journal_file):
+                self._journal_size = 0
+            else:
+                self.compact()
+                return
+            # end if
+        # end if
+        if self._journal_size >= max(self._compact_min_size, self._compact_ratio * self._snapshot_size):
+            self.compact()
+            return
+        # end if
+        data = "".join(self._journal_lines())
+        if data and not self._journal_ends_with_newline:
+            data = "\n" + data  # the rest of the broken line would be prepended to our first one otherwise.
+        # end if
+        with open(self._journal_file, "a") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+            self._journal_size = file.tell()
+        # end with
+        if data:
+            self._journal_ends_with_newline = True
+        # end if
+        self._changed_keys.clear()
+        self._saved()
+    # end def
+
+    def compact(self):
+        """
+        Writes all the data as new snapshot, and empties the journal.
+        """
+        super(JournalAutosaveDictObject, self).store_database()
+        # If we crash right here, the journal is replayed on top of the new snapshot, which is harmless.
+        with open(self._journal_file, "w") as file:
+            file.flush()
+            os.fsync(file.fileno())
+        # end with
+        self._journal_size = 0
+        self._journal_ends_with_newline = True
+        self._snapshot_size = os.path.getsize(self._database_file)
+        self._changed_keys.clear()
+    # end def
+
+    def load_database(self, merge=False):
+        with self._loading():
+            try:
+                super(JournalAutosaveDictObject, self).load_database(merge=merge)
+                self._snapshot_size = os.path.getsize(self._database_file)
+            except IOError as e:
+                if e.errno != errno.ENOENT or not os.path.exists(self._journal_file):
+                    raise
+                # end if
+                if not merge:
+                    self.clear()
+                # end if
+                self._snapshot_size = 0
+            # end try
+            self._replay_journal()
+        # end with
+    # end def
+
+    def _replay_journal(self):
+        try:
+            file = open(self._journal_file, "r")
+        except IOError as e:
+            if e.errno == errno.ENOENT:
+                self._journal_size = 0
+                return
+            # end if
+            raise
+        # end try
+        with file:
+            line = ""
+            for line in file:
+                if not line.strip():
+                    continue
+                # end if
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning("Ignoring broken line in journal {file!r}: {line!r}".format(file=self._journal_file, line=line))
+                    continue
+                # end try
+                key = record["path"][0]
+                if record["op"] == "set":
+                    self.merge_dict({key: record["value"]})
+                elif dict.__contains__(self, key):
+                    if self._cow_epoch != _snapshots.epoch:
+                        _save_for_snapshots(self)
+                    # end if
+                    dict.__delitem__(self, key)
+                    attribute_name = self.get_attribute_name_by_key(key)
+                    if self._attribute_to_key_map.get(attribute_name) == key:
+                        del self._own_attribute_map()[attribute_name]
+                    # end if
+                # end if
+            # end for
+            self._journal_size = file.tell()
+            self._journal_ends_with_newline = not line or line.endswith("\n")
+        # end with
+    # end def
+# end class
+
+
+class SqliteAutosaveDictObject(_PerKeyAutosaveDictObject):
+    """
+    An AutosaveDictObject storing the data in a sqlite database (in WAL mode), one row per top level key,
+    with the value stored as json. Saving only writes the rows of the changed keys, in one transaction,
+    and deleting a key deletes its row.
+
+    It takes the same arguments as AutosaveDictObject, and the coalescing (save_interval, max_unsaved_changes),
+    flush(), close() and batch() work the same. Keys are stored as strings, like json does.
+
+        >>> a = SqliteAutosaveDictObject("./test7.sqlite", defaults={"version": 1})
+        >>> a.foo = "bar"
+        >>> a.users = [{"name": "Littlepip"}]
+        >>> a.users[0].name = "Velvet Remedy"
+        >>> a[2] = "two"
+        >>> del a.foo
+        >>> b = SqliteAutosaveDictObject("./test7.sqlite")
+        >>> b == {"version": 1, "users": [{"name": "Velvet Remedy"}], "2": "two"}
+        True
+        >>> b.users[0].name
+        'Velvet Remedy'
+
+        With `lazy=True` only the keys are read when loading, and a value is read when it is accessed the first time.
+        The keys are known without reading the values, so iterating, keys() and len() don't read them.
+        Other operations on the whole data, like comparing, values() or items(), read all of them.
+        Note: Reading it with plain dict functions like `dict.items(obj)`, or DictObject.normalify(), only sees the
+        already loaded values. Call `load_all()` before.
+
+        >>> c = SqliteAutosaveDictObject("./test7.sqlite", lazy=True)
+        >>> dict.__len__(c)
+        0
+        >>> c.version
+        1
+        >>> dict.__len__(c)
+        1
+        >>> len(c), sorted(c.keys()), dict.__len__(c)
+        (3, ['2', 'users', 'version'], 1)
+        >>> "users" in c, c.get("2")
+        (True, 'two')
+        >>> c == b
+        True
+        >>> d = SqliteAutosaveDictObject("./test7.sqlite", lazy=True)
+        >>> d.snapshot()["2"]  # a snapshot reads all of them
+        'two'
+        >>> d.close()
+
+        Stored values win over the defaults, lazy or not:
+
+        >>> e = SqliteAutosaveDictObject("./test7.sqlite", lazy=True, defaults={"version": 0, "new": True})
+        >>> e.version, len(e), sorted(e.keys())
+        (1, 4, ['2', 'new', 'users', 'version'])
+        >>> e.close()
+        >>> SqliteAutosaveDictObject("./test7.sqlite").version
+        1
+
+        With `load_now=False` the existing data is overwritten, like with AutosaveDictObject:
+
+        >>> f = SqliteAutosaveDictObject("./test7.sqlite", load_now=False)
+        >>> f.only = "this"
+        >>> f.close()
+        >>> SqliteAutosaveDictObject("./test7.sqlite") == {"only": "this"}
+        True
+        >>> c.close()
+        >>> a.close()
+        >>> b.close()
+        >>> for suffix in ("", "-wal", "-shm"):
+        ...     if os.path.exists("./test7.sqlite" + suffix):
+        ...         os.remove("./test7.sqlite" + suffix)
+    """
+    def __init__(
+        self, file, autosafe=True, path=None, load_now=True, defaults=None, save_interval=None, max_unsaved_changes=None,
+        lazy=False, *args, **kwargs
+    ):
+        """
+        Initializes the object.
+
+        See AutosaveDictObject for the other parameters.
+        :param lazy: If the values should only be read from the database when they are first accessed. Default: False
+        """
+        self._lazy = lazy
+        self._unloaded_keys = set()
+        self._connection = None
+        self._database_read = False  # until then, the rows of the database are not the ones of this object.
+        self.__init_constructor__(autosafe, defaults, file, load_now, path, args, kwargs, save_interval, max_unsaved_changes)
+    # end def
+
+    def _connect(self):
+        if self._connection is None:
+            import sqlite3
+            self._connection = sqlite3.connect(self._database_file)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS dictobject (key TEXT PRIMARY KEY NOT NULL, value TEXT NOT NULL)"
+            )
+        # end if
+        return self._connection
+    # end def
+
+    def store_database(self):
+        """
+        Writes the rows of all the changed keys.
+        If it was never loaded (`load_now=False`), the first store replaces all the rows, like AutosaveDictObject
+        overwrites the file.
+        """
+        connection = self._connect()
+        with connection:  # one transaction
+            if self._database_read:
+                keys = self._changed_keys
+            else:
+                connection.execute("DELETE FROM dictobject")
+                keys = list(dict.keys(self))
+            # end if
+            for key in keys:
+                if dict.__contains__(self, key):
+                    value = json.dumps(dict.__getitem__(self, key), separators=(',', ':'), default=_json_default)
+                    connection.execute(
+                        "INSERT OR REPLACE INTO dictobject (key, value) VALUES (?, ?)", (_json_key(key), value)
+                    )
+                else:
+                    connection.execute("DELETE FROM dictobject WHERE key = ?", (_json_key(key),))
+                # end if
+            # end for
+        # end with
+        self._changed_keys.clear()
+        self._database_read = True
+        self._saved()
+        logger.debug("Saved SqliteAutosaveDictObject to {path}".format(path=self._database_file))
+    # end def
+
+    def load_database(self, merge=False):
+        logger.debug("Loading database from {file}.".format(file=self._database_file))
+        connection = self._connect()
+        with self._loading():
+            if not merge:
+                self.clear()
+                self._unloaded_keys.clear()
+            # end if
+            if self._lazy:
+                keys = [key for (key,) in connection.execute("SELECT key FROM dictobject")]
+                attribute_to_key_map = self._own_attribute_map()
+                for key in keys:
+                    if dict.__contains__(self, key):
+                        # The stored value wins (as when merging it), e.g. over a default. It is read when needed.
+                        DictObject.pop(self, key)
+                        self._changed_keys.pop(key, None)
+                    # end if
+                    attribute_to_key_map[self.get_attribute_name_by_key(key)] = key
+                # end for
+                self._unloaded_keys.update(keys)
+            else:
+                self.merge_dict({
+                    key: self._str_to_json(value) for key, value in connection.execute("SELECT key, value FROM dictobject")
+                })
+            # end if
+        # end with
+        self._database_read = True
+    # end def
+
+    def _load_key(self, key):
+        """
+        Reads the value of a key, which wasn't loaded yet.
+        """
+        self._unloaded_keys.discard(key)
+        row = self._connect().execute("SELECT value FROM dictobject WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        # end if
+        with self._loading():
+            self._add_to_object_part(key, self._str_to_json(row[0]))
+        # end with
+        return dict.__getitem__(self, key)
+    # end def
+
+    def load_all(self):
+        """
+        Reads all the values which are not loaded yet (with `lazy=True`).
+        """
+        if self._unloaded_keys:
+            with self._loading():
+                for key in list(self._unloaded_keys):
+                    self._load_key(key)
+                # end for
+            # end with
+        # end if
+    # end def
+
+    def snapshot(self):
+        self.load_all()  # the snapshot reads the stored values directly.
+        return super(SqliteAutosaveDictObject, self).snapshot()
+    # end def
+
+    def _add_to_object_part(self, name, obj):
+        if self._unloaded_keys:
+            self._unloaded_keys.discard(name)  # overwritten, no need to load it any longer.
+        # end if
+        super(SqliteAutosaveDictObject, self)._add_to_object_part(name, obj)
+    # end def
+
+    def __missing__(self, key):
+        # called by dict's __getitem__ for keys not in the dict.
+        if key in self._unloaded_keys:
+            return self._load_key(key)
+        # end if
+        raise KeyError(key)
+    # end def
+
+    def get(self, key, default=None):
+        if key in self._unloaded_keys:
+            self._load_key(key)
+        # end if
+        return super(SqliteAutosaveDictObject, self).get(key, default)
+    # end def
+
+    def __contains__(self, key):
+        return key in self._unloaded_keys or super(SqliteAutosaveDictObject, self).__contains__(key)
+    # end def
+
+    def __delitem__(self, key):
+        if key in self._unloaded_keys:
+            self._load_key(key)
+        # end if
+        super(SqliteAutosaveDictObject, self).__delitem__(key)
+    # end def
+
+    def __delattr__(self, name):
+        key = self._attribute_to_key_map.get(name)
+        if key in self._unloaded_keys:
+            self._load_key(key)
+        # end if
+        super(SqliteAutosaveDictObject, self).__delattr__(name)
+    # end def
+
+    def pop(self, key, *default):
+        if key in self._unloaded_keys:
+            self._load_key(key)
+        # end if
+        return super(SqliteAutosaveDictObject, self).pop(key, *default)
+    # end def
+
+    def setdefault(self, key, default=None):
+        if key in self._unloaded_keys:
+            self._load_key(key)
+        # end if
+        return super(SqliteAutosaveDictObject, self).setdefault(key, default)
+    # end def
+
+    def clear(self):
+        if not self._is_loading:
+            self._changed_keys.update(dict.fromkeys(self._unloaded_keys))  # deletes their rows with the next save.
+        # end if
+        self._unloaded_keys.clear()
+        super(SqliteAutosaveDictObject, self).clear()
+    # end def
+
+    # Those need only the keys, which are the loaded ones and the unloaded ones.
+
+    def __iter__(self):
+        if not self._unloaded_keys:
+            return super(SqliteAutosaveDictObject, self).__iter__()
+        # end if
+        # copies, as reading a value while iterating moves it from _unloaded_keys into the dict.
+        return itertools.chain(list(dict.__iter__(self)), list(self._unloaded_keys))
+    # end def
+
+    def __len__(self):
+        return super(SqliteAutosaveDictObject, self).__len__() + len(self._unloaded_keys)
+    # end def
+
+    def keys(self):
+        if not self._unloaded_keys:
+            return super(SqliteAutosaveDictObject, self).keys()
+        # end if
+        return KeysView(self)
+    # end def
+
+    # Those need all the values.
+
+    def __eq__(self, other):
+        self.load_all()
+        return super(SqliteAutosaveDictObject, self).__eq__(other)
+    # end def
+
+    def __ne__(self, other):
+        self.load_all()
+        return super(SqliteAutosaveDictObject, self).__ne__(other)
+    # end def
+
+    def __repr__(self):
+        self.load_all()
+        return super(SqliteAutosaveDictObject, self).__repr__()
+    # end def
+
+    def values(self):
+        self.load_all()
+        return super(SqliteAutosaveDictObject, self).values()
+    # end def
+
+    def items(self):
+        self.load_all()
+        return super(SqliteAutosaveDictObject, self).items()
+    # end def
+
+    def copy(self):
+        self.load_all()
+        return super(SqliteAutosaveDictObject, self).copy()
+    # end def
+
+    def popitem(self):
+        self.load_all()
+        return super(SqliteAutosaveDictObject, self).popitem()
+    # end def
+
+    def close(self):
+        """
+        Writes the not yet written changes to disk, and closes the database connection.
+        """
+        super(SqliteAutosaveDictObject, self).close()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        # end if
+    # end def
+# end class
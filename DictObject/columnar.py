@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+import array
+import itertools
+
+try:
+    from collections.abc import MutableMapping  # python 3
+except ImportError:
+    from collections import MutableMapping  # py2
+# end try
+
+from luckydonaldUtils.encoding import to_native as n
+
+from . import DictObject, DictObjectList, suppress_context
+from .records import _unique_attribute_names
+
+__author__ = 'luckydonald'
+
+
+def _column(values):
+    """
+    Stores the values of a column as array.array if they are all ints (not bools), or all floats, else as list.
+    """
+    for typecode, value_type in (("q", int), ("d", float)):
+        if values and all(type(value) is value_type for value in values):
+            try:
+                return array.array(typecode, values)
+            except (OverflowError, ValueError):  # ints bigger than 64 bit (or no "q" in python 2)
+                break
+            # end try
+        # end if
+    # end for
+    return [DictObject.objectify(value) for value in values]
+# end def
+
+
+class ColumnarDictObjectList(object):
+    """
+    A list of records (dicts) with the same keys, stored as one column per key, instead of one dict per record.
+    Columns of ints or floats are stored as `array.array`, which needs a lot less memory than a list.
+
+        >>> rows = [{"name": "Littlepip", "caps": 120, "hp": 0.5}, {"name": "Calamity", "caps": 80, "hp": 1.0},
+        ...         {"name": "Velvet Remedy", "caps": 310, "hp": 0.9}]
+        >>> table = DictObjectList.from_records(rows, columnar=True)
+        >>> len(table), table == rows
+        (3, True)
+        >>> table.column("caps")
+        array('q', [120, 80, 310])
+
+    Indexing returns a row, which is a light proxy into the columns, with the usual attribute access.
+    Changing it changes the table. (The rows are created on access, so `table[0] is table[0]` is False.)
+
+        >>> table[0].name, table[-1]["caps"]
+        ('Littlepip', 310)
+        >>> table[1].caps += 20
+        >>> table.column("caps")
+        array('q', [120, 100, 310])
+
+    filter(), sort_by() and the aggregates work on the columns, without creating rows.
+
+        >>> rich = table.filter("caps", lambda caps: caps > 110)
+        >>> [row.name for row in rich.sort_by("caps", reverse=True)]
+        ['Velvet Remedy', 'Littlepip']
+        >>> table.sum("caps"), table.min("hp"), table.max("name"), table.mean("caps")
+        (530, 0.5, 'Velvet Remedy', 176.66666666666666)
+
+    Rows can be added, missing keys are None.
+
+        >>> table.append({"name": "Homage", "caps": 5})
+        >>> table[3].hp is None, table.column("hp")
+        (True, [0.5, 1.0, 0.9, None])
+        >>> isinstance(table.to_dict_object_list()[3], DictObject)
+        True
+    """
+    __slots__ = ("_keys", "_columns", "_length", "_attribute_to_key")
+
+    def __init__(self, rows=(), keys=None):
+        """
+        :param rows: The records.
+        :param keys: The keys, in case not every record has all the keys. Default: The keys of the records.
+        """
+        rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+        if keys is None:
+            keys = {}  # used as ordered set
+            for row in rows:
+                keys.update(dict.fromkeys(row))
+            # end for
+        # end if
+        self._keys = list(keys)
+        self._columns = {key: _column([row.get(key) for row in rows]) for key in self._keys}
+        self._length = len(rows)
+        self._attribute_to_key = {
+            attribute_name: key for key, attribute_name in _unique_attribute_names(self._keys).items()
+        }
+    # end def
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Creates it from a dict of key: list of the values.
+
+            >>> ColumnarDictObjectList.from_columns({"id": [1, 2], "name": ["a", "b"]})[1]
+            {'id': 2, 'name': 'b'}
+        """
+        keys = list(columns)
+        lengths = set(len(column) for column in columns.values())
+        if len(lengths) > 1:
+            raise ValueError("All columns need to have the same length.")
+        # end if
+        return cls._from_columns(
+            keys, {key: _column(list(columns[key])) for key in keys}, lengths.pop() if lengths else 0,
+            {attribute_name: key for key, attribute_name in _unique_attribute_names(keys).items()},
+        )
+    # end def
+
+    def to_numpy(self, fields, dtype=None):
+        """
+        The values of one or more columns as numpy array (or structured array). See DictObjectList.to_numpy().
+        Number columns are copied with the buffer protocol, without going through python numbers.
+
+            >>> table = ColumnarDictObjectList([{"id": 1, "price": 2.5}, {"id": 2, "price": 4.0}])
+            >>> list(table.to_numpy("price"))
+            [2.5, 4.0]
+        """
+        single = not isinstance(fields, (list, tuple))
+        names = [fields] if single else list(fields)
+        return _columns_to_numpy(names, [self._columns[name] for name in names], dtype, single)
+    # end def
+
+    @classmethod
+    def _from_columns(cls, keys, columns, length, attribute_to_key):
+        self = cls.__new__(cls)
+        self._keys = keys
+        self._columns = columns
+        self._length = length
+        self._attribute_to_key = attribute_to_key
+        return self
+    # end def
+
+    def _take(self, indices):
+        """
+        A new table with only the rows at the given indices, in that order.
+        """
+        columns = {}
+        for key, column in self._columns.items():
+            values = [column[i] for i in indices]
+            columns[key] = array.array(column.typecode, values) if isinstance(column, array.array) else values
+        # end for
+        return self._from_columns(list(self._keys), columns, len(indices), self._attribute_to_key)
+    # end def
+
+    def keys(self):
+        """
+        :return: The keys of the records.
+        """
+        return list(self._keys)
+    # end def
+
+    def column(self, key):
+        """
+        All the values of a key. This is the column itself (a list or an array.array), not a copy.
+        """
+        return self._columns[key]
+    # end def
+
+    def __len__(self):
+        return self._length
+    # end def
+
+    def _index(self, index):
+        if index < 0:
+            index += self._length
+        # end if
+        if not 0 <= index < self._length:
+            raise IndexError("list index out of range")
+        # end if
+        return index
+    # end def
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._take(range(*index.indices(self._length)))
+        # end if
+        return ColumnarRow(self, self._index(index))
+    # end def
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield ColumnarRow(self, i)
+        # end for
+    # end def
+
+    def __eq__(self, other):
+        if not isinstance(other, (ColumnarDictObjectList, list, tuple)) or len(other) != len(self):
+            return False
+        # end if
+        return all(row == other_row for row, other_row in zip(self, other))
+    # end def
+
+    def __ne__(self, other):
+        return not self == other
+    # end def
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{name}({rows!r})".format(name=type(self).__name__, rows=[dict(row.items()) for row in self])
+    # end def
+
+    def _set(self, key, index, value):
+        column = self._columns.get(key)
+        if column is None:
+            self._keys.append(key)
+            column = self._columns[key] = [None] * self._length
+            self._attribute_to_key = {
+                attribute_name: key for key, attribute_name in _unique_attribute_names(self._keys).items()
+            }
+        # end if
+        if isinstance(column, array.array):
+            if type(value) is (int if column.typecode == "q" else float):
+                try:
+                    column[index] = value
+                    return
+                except OverflowError:
+                    pass
+                # end try
+            # end if
+            # not the same kind of number any longer, store it as list from now on.
+            column = self._columns[key] = list(column)
+        # end if
+        column[index] = DictObject.objectify(value)
+    # end def
+
+    def append(self, row):
+        """
+        Adds a record at the end. Keys not known yet become a new column.
+        """
+        for key in self._keys:
+            column = self._columns[key]
+            if isinstance(column, array.array):
+                if key in row:
+                    column.append(0)  # replaced below
+                    continue
+                # end if
+                column = self._columns[key] = list(column)  # for the None
+            # end if
+            column.append(None)
+        # end for
+        self._length += 1
+        for key, value in row.items():
+            self._set(key, self._length - 1, value)
+        # end for
+    # end def
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+        # end for
+    # end def
+
+    def filter(self, key, predicate):
+        """
+        The rows where `predicate(row[key])` is true, as new ColumnarDictObjectList.
+        """
+        return self._take(list(itertools.compress(range(self._length), map(predicate, self._columns[key]))))
+    # end def
+
+    def sort_by(self, key, reverse=False):
+        """
+        The rows sorted by the values of a key, as new ColumnarDictObjectList.
+        """
+        column = self._columns[key]
+        return self._take(sorted(range(self._length), key=column.__getitem__, reverse=reverse))
+    # end def
+
+    def sum(self, key):
+        return sum(self._columns[key])
+    # end def
+
+    def min(self, key):
+        return min(self._columns[key])
+    # end def
+
+    def max(self, key):
+        return max(self._columns[key])
+    # end def
+
+    def mean(self, key):
+        return sum(self._columns[key]) / float(self._length)
+    # end def
+
+    def to_dict_object_list(self):
+        """
+        :return: A DictObjectList, with a DictObject for every row.
+        """
+        return DictObjectList([row.to_dict_object() for row in self])
+    # end def
+# end class
+
+
+class ColumnarRow(MutableMapping):
+    """
+    A row of a ColumnarDictObjectList, reading and writing the values from and to its columns.
+    """
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_index", index)
+    # end def
+
+    def __getattr__(self, name):
+        try:
+            key = self._table._attribute_to_key[name]
+        except KeyError:
+            raise suppress_context(AttributeError(name))
+        # end try
+        return self._table._columns[key][self._index]
+    # end def
+
+    def __setattr__(self, name, value):
+        self._table._set(self._table._attribute_to_key.get(name, name), self._index, value)
+    # end def
+
+    def __getitem__(self, key):
+        return self._table._columns[key][self._index]
+    # end def
+
+    def __setitem__(self, key, value):
+        self._table._set(key, self._index, value)
+    # end def
+
+    def __delitem__(self, key):
+        raise TypeError("The keys of a ColumnarDictObjectList can't be deleted.")
+    # end def
+
+    def __iter__(self):
+        return iter(self._table._keys)
+    # end def
+
+    def __len__(self):
+        return len(self._table._keys)
+    # end def
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+    # end def
+
+    def to_dict_object(self):
+        return DictObject(dict(self.items()))
+    # end def
+# end class
+
+
+def _import_numpy():
+    """
+    numpy is optional, so it is imported only when needed.
+
+    :return: The numpy module, or None if it isn't installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    # end try
+    return numpy
+# end def
+
+
+def _to_array(values, typecode=None):
+    """
+    array.array of the values, for when there is no numpy. Without typecode, ints are "q", other numbers "d".
+    """
+    if isinstance(values, array.array) and typecode in (None, values.typecode):
+        return array.array(values.typecode, values)
+    # end if
+    if typecode is None:
+        if all(type(value) is int for value in values):
+            typecode = "q"
+        elif all(type(value) in (int, float) for value in values):
+            typecode = "d"
+        else:
+            raise TypeError("Only numbers can be stored in an array.array, install numpy for other values.")
+        # end if
+    # end if
+    return array.array(typecode, values)
+# end def
+
+
+def _columns_to_numpy(names, columns, dtype, single):
+    """
+    For DictObjectList.to_numpy() and ColumnarDictObjectList.to_numpy().
+
+    :param single: If it should be one array of columns[0], instead of a structured array.
+    """
+    numpy = _import_numpy()
+    if numpy is None:
+        if single:
+            return _to_array(columns[0], dtype)
+        # end if
+        return {name: _to_array(column, dtype) for name, column in zip(names, columns)}
+    # end if
+    if single:
+        return numpy.array(columns[0], dtype=dtype)
+    # end if
+    if dtype is None:
+        columns = [numpy.asarray(column) for column in columns]
+        dtype = [(n(name), column.dtype) for name, column in zip(names, columns)]
+    # end if
+    result = numpy.empty(len(columns[0]) if columns else 0, dtype=dtype)
+    for name, column in zip(result.dtype.names, columns):
+        result[name] = column
+    # end for
+    return result
+# end def
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+from . import DictObject, DictObjectList, DictObjectSet, _EMPTY_ATTRIBUTE_MAP
+
+__author__ = 'luckydonald'
+
+
+def _freeze(value):
+    """
+    The immutable version of a value: FrozenDictObject for dicts, FrozenDictObjectList for lists,
+    frozenset for sets, and tuples with the content frozen.
+    """
+    if isinstance(value, (FrozenDictObject, FrozenDictObjectList, frozenset)):
+        return value
+    elif isinstance(value, dict):
+        return FrozenDictObject(dict.items(value) if isinstance(value, DictObject) else value.items())
+    elif isinstance(value, list):
+        return FrozenDictObjectList(list.__iter__(value) if isinstance(value, DictObjectList) else value)
+    elif isinstance(value, set):
+        return frozenset(_freeze(x) for x in value)
+    elif isinstance(value, tuple):
+        return type(value)(_freeze(x) for x in value)
+    # end if
+    return value
+# end def
+
+
+def _thaw(value):
+    """
+    Reverses _freeze(), returning DictObjects, DictObjectLists and DictObjectSets.
+    """
+    if isinstance(value, FrozenDictObject):
+        return DictObject({key: _thaw(x) for key, x in dict.items(value)})
+    elif isinstance(value, FrozenDictObjectList):
+        return DictObjectList([_thaw(x) for x in list.__iter__(value)])
+    elif isinstance(value, frozenset):
+        return DictObjectSet(_thaw(x) for x in value)
+    elif isinstance(value, tuple):
+        return type(value)(_thaw(x) for x in value)
+    # end if
+    return value
+# end def
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError("{type} is immutable, use thaw() to get a changeable copy.".format(type=type(self).__name__))
+# end def
+
+
+class FrozenDictObject(DictObject):
+    """
+    An immutable DictObject, which can be used in sets, or as dict key.
+    All the values in it are frozen as well. The hash is calculated once, when it is first needed.
+
+        >>> a = FrozenDictObject({"name": "Littlepip", "tags": ["pony"], "stats": {"luck": 10}})
+        >>> a.stats.luck, a.tags
+        (10, ['pony'])
+        >>> isinstance(a.stats, FrozenDictObject), isinstance(a.tags, FrozenDictObjectList)
+        (True, True)
+        >>> b = DictObject({"name": "Littlepip", "tags": ["pony"], "stats": {"luck": 10}}).freeze()
+        >>> len({a, b}), a == b, {a: "cached"}[b]
+        (1, True, 'cached')
+        >>> a.name = "Calamity"
+        Traceback (most recent call last):
+            ...
+        TypeError: FrozenDictObject is immutable, use thaw() to get a changeable copy.
+        >>> a.tags.append("unicorn")
+        Traceback (most recent call last):
+            ...
+        TypeError: FrozenDictObjectList is immutable, use thaw() to get a changeable copy.
+        >>> c = a.thaw()
+        >>> c.tags.append("unicorn")
+        >>> c == a, type(c) is DictObject, type(c.stats) is DictObject
+        (False, True, True)
+
+    When comparing two FrozenDictObjects, which already know their hash, different hashes mean they aren't equal,
+    without comparing the content.
+    """
+    __slots__ = ("_hash",)
+
+    def __new__(cls, *args, **kwargs):
+        self = super(FrozenDictObject, cls).__new__(cls)
+        self._hash = None
+        return self
+    # end def
+
+    def __init__(self, *args, **kwargs):
+        self._attribute_to_key_map = _EMPTY_ATTRIBUTE_MAP
+        for arg in args + ((kwargs,) if kwargs else ()):
+            DictObject.merge_dict(self, arg if isinstance(arg, dict) else dict(arg))
+        # end for
+    # end def
+
+    def _add_to_object_part(self, name, obj):
+        dict.__setitem__(self, name, _freeze(obj))
+    # end def
+
+    def __setattr__(self, name, value):
+        if not name.startswith("_"):
+            _immutable(self)
+        # end if
+        super(FrozenDictObject, self).__setattr__(name, value)
+    # end def
+
+    def __delattr__(self, name):
+        if not name.startswith("_"):
+            _immutable(self)
+        # end if
+        super(FrozenDictObject, self).__delattr__(name)
+    # end def
+
+    __setitem__ = __delitem__ = __iadd__ = merge_dict = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(dict.items(self)))
+        # end if
+        return self._hash
+    # end def
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        # end if
+        if isinstance(other, FrozenDictObject) and self._hash is not None and other._hash is not None:
+            if self._hash != other._hash:
+                return False
+            # end if
+        # end if
+        return dict.__eq__(self, other)
+    # end def
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+    # end def
+
+    def __reduce__(self):
+        return type(self), (dict(dict.items(self)),)
+    # end def
+
+    def __copy__(self):
+        return self
+    # end def
+
+    def __deepcopy__(self, memo):
+        return self
+    # end def
+
+    def freeze(self):
+        return self
+    # end def
+
+    def thaw(self):
+        """
+        :return: A changeable DictObject of this, with all the nested values changeable as well.
+        """
+        return _thaw(self)
+    # end def
+# end class
+
+
+class FrozenDictObjectList(DictObjectList):
+    """
+    An immutable DictObjectList, with all the values in it frozen as well. See FrozenDictObject.
+
+        >>> l = DictObjectList([1, {"a": 2}]).freeze()
+        >>> l[1].a, hash(l) == hash(FrozenDictObjectList([1, {"a": 2}]))
+        (2, True)
+        >>> l.thaw() + [3]
+        [1, {'a': 2}, 3]
+    """
+    __slots__ = ("_hash",)
+
+    def __init__(self, iterable=()):
+        list.__init__(self, (_freeze(x) for x in iterable))
+        self._hash = None
+    # end def
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = sort = reverse = clear = _immutable
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(list.__iter__(self)))
+        # end if
+        return self._hash
+    # end def
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        # end if
+        if isinstance(other, FrozenDictObjectList) and self._hash is not None and other._hash is not None:
+            if self._hash != other._hash:
+                return False
+            # end if
+        # end if
+        return list.__eq__(self, other)
+    # end def
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+    # end def
+
+    def __reduce__(self):
+        return type(self), (list(list.__iter__(self)),)
+    # end def
+
+    def __copy__(self):
+        return self
+    # end def
+
+    def __deepcopy__(self, memo):
+        return self
+    # end def
+
+    def freeze(self):
+        return self
+    # end def
+
+    def thaw(self):
+        """
+        :return: A changeable DictObjectList of this, with all the nested values changeable as well.
+        """
+        return _thaw(self)
+    # end def
+# end class
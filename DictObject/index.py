@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import operator
+
+from . import DictObjectList, _NOT_FOUND
+
+__author__ = 'luckydonald'
+
+
+class DictObjectListIndex(object):
+    """
+    An index of the records (dicts) in a DictObjectList by the value of one or more keys.
+    Use DictObjectList.create_index() to get one.
+
+    It keeps the records themselves, not their positions, so inserting or deleting
+    in the middle of the list doesn't have to move anything.
+    For a unique index, `index[value]` is the record, else a list of all the matching records.
+    With several keys the value is a tuple.
+
+        >>> l = DictObjectList([{"id": 1}, {"id": 2}, {"id": 1}])
+        >>> index = l.create_index("id")
+        >>> index[1]
+        [{'id': 1}, {'id': 1}]
+        >>> 2 in index, 3 in index, len(index)
+        (True, False, 2)
+        >>> l.sort(key=lambda x: x.id)
+        >>> index[2] == [l[2]]
+        True
+    """
+    __slots__ = ("_list", "fields", "unique", "dirty", "_entries", "_key_of", "hits", "misses", "rebuilds")
+
+    def __init__(self, dict_object_list, fields, unique=False):
+        self._list = dict_object_list
+        self.fields = fields
+        self.unique = unique
+        self.dirty = True  # set when the index doesn't match the list, it will be rebuilt on the next lookup.
+        self._entries = {}
+        self._key_of = operator.itemgetter(*fields)  # a tuple for several keys
+        self.hits = self.misses = self.rebuilds = 0
+    # end def
+
+    def _key(self, row):
+        try:
+            key = self._key_of(row)
+            hash(key)
+        except (KeyError, IndexError, TypeError):
+            return _NOT_FOUND
+        # end try
+        return key
+    # end def
+
+    def _duplicate(self, key):
+        return ValueError("Duplicate value {key!r} for the unique index on {fields!r}.".format(key=key, fields=self.fields))
+    # end def
+
+    def rebuild(self):
+        """
+        Builds the index again, from all the records of the list.
+        """
+        self._entries = {}
+        self.dirty = True  # in case of a duplicate
+        self.rebuilds += 1
+        for row in list.__iter__(self._list):  # the list itself, no wrapping of LazyDictObjectList records.
+            key = self._key(row)
+            if key is not _NOT_FOUND:
+                if self.unique and key in self._entries:
+                    raise self._duplicate(key)
+                # end if
+                self._add(key, row)
+            # end if
+        # end for
+        self.dirty = False
+    # end def
+
+    def check(self, rows, removed=()):
+        """
+        Raises a ValueError if adding those records would break a unique index.
+
+        :param rows: The records to add.
+        :param removed: The records replaced by them.
+        """
+        if not self.unique:
+            return
+        # end if
+        if self.dirty:
+            self.rebuild()
+        # end if
+        seen = set()
+        for row in rows:
+            key = self._key(row)
+            if key is _NOT_FOUND:
+                continue
+            # end if
+            existing = self._entries.get(key, _NOT_FOUND)
+            if key in seen or (existing is not _NOT_FOUND and not any(existing is old for old in removed)):
+                raise self._duplicate(key)
+            # end if
+            seen.add(key)
+        # end for
+    # end def
+
+    def _add(self, key, row):
+        if self.unique:
+            self._entries[key] = row
+        else:
+            self._entries.setdefault(key, []).append(row)
+        # end if
+    # end def
+
+    def add(self, row):
+        if self.dirty:
+            return  # the rebuild will find it.
+        # end if
+        key = self._key(row)
+        if key is not _NOT_FOUND:
+            self._add(key, row)
+        # end if
+    # end def
+
+    def remove(self, row):
+        if self.dirty:
+            return
+        # end if
+        key = self._key(row)
+        if key is _NOT_FOUND:
+            return
+        # end if
+        entry = self._entries.get(key)
+        if self.unique:
+            if entry is row:
+                del self._entries[key]
+                return
+            # end if
+        elif entry is not None:
+            for i, existing in enumerate(entry):
+                if existing is row:
+                    del entry[i]
+                    if not entry:
+                        del self._entries[key]
+                    # end if
+                    return
+                # end if
+            # end for
+        # end if
+        self.dirty = True  # the record was changed after it was added, so it is somewhere else.
+    # end def
+
+    def _lookup(self, key):
+        if self.dirty:
+            self.rebuild()
+        # end if
+        entry = self._entries.get(key, _NOT_FOUND)
+        if entry is not _NOT_FOUND:
+            # a record changed in place is found by its old value, so check it's still right.
+            if any(self._key(row) != key for row in ((entry,) if self.unique else entry)):
+                self.rebuild()
+                entry = self._entries.get(key, _NOT_FOUND)
+            # end if
+        # end if
+        if entry is _NOT_FOUND:
+            self.misses += 1
+        else:
+            self.hits += 1
+        # end if
+        return entry
+    # end def
+
+    def __getitem__(self, key):
+        entry = self._lookup(key)
+        if entry is _NOT_FOUND:
+            raise KeyError(key)
+        # end if
+        return entry
+    # end def
+
+    def get(self, key, default=None):
+        entry = self._lookup(key)
+        return default if entry is _NOT_FOUND else entry
+    # end def
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _NOT_FOUND
+    # end def
+
+    def __len__(self):
+        if self.dirty:
+            self.rebuild()
+        # end if
+        return len(self._entries)
+    # end def
+
+    def __repr__(self):
+        return "<{cls} on {fields!r}{unique}>".format(
+            cls=type(self).__name__, fields=self.fields, unique=" (unique)" if self.unique else "",
+        )
+    # end def
+
+    def stats(self):
+        """
+        :return: A dict with `unique`, the number of `keys`, indexed `rows`, lookup `hits` and `misses`,
+                 how often it was built (`rebuilds`), and if it is `dirty` (will be rebuilt on the next lookup).
+        """
+        return {
+            "unique": self.unique,
+            "keys": len(self._entries),
+            "rows": len(self._entries) if self.unique else sum(len(rows) for rows in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+            "dirty": self.dirty,
+        }
+    # end def
+# end class
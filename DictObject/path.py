@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+import re
+import itertools
+
+try:
+    from collections.abc import Mapping  # python 3
+except ImportError:
+    from collections import Mapping  # py2
+# end try
+
+from . import DictObject, DictObjectList, _BoundedCache, _NOT_FOUND
+from .frozen import FrozenDictObject, FrozenDictObjectList
+from .records import DictObjectRecord
+from .columnar import ColumnarRow
+
+__author__ = 'luckydonald'
+
+
+_compiled_paths = _BoundedCache(maxsize=1000)  # path: DictObjectPath, see DictObject.compile_path()
+_PATH_ALL = object()  # the `[*]` in a path.
+_PATH_SEGMENT = re.compile(r"""
+    (?P<dot>\.)?(?P<name>[^.\[\]\s]+)               # name, or .name
+    | \[\s*(?P<index>-?\d+)\s*]                       # [0]
+    | \[\s*(?P<all>\*)\s*]                            # [*]
+    | \[\s*(?P<quote>["'])(?P<key>(?:\\.|(?!(?P=quote)).)*)(?P=quote)\s*]  # ["key"]
+""", re.VERBOSE)
+_PATH_ESCAPE = re.compile(r"\\(.)")
+
+
+def _parse_path(path):
+    """
+    Splits a path into the keys.
+
+        >>> _parse_path('a.b[0]["c.d"][*].*') == ["a", "b", 0, "c.d", _PATH_ALL, _PATH_ALL]
+        True
+        >>> _parse_path("a..b")
+        Traceback (most recent call last):
+        ...
+        ValueError: Invalid path 'a..b' at position 1.
+
+    :param path: The path, see DictObject.compile_path().
+    :return: A list of the keys (str or int), and _PATH_ALL for the wildcards.
+    """
+    keys = []
+    position = 0
+    while position < len(path):
+        match = _PATH_SEGMENT.match(path, position)
+        if match is None or (match.group("name") is not None and bool(match.group("dot")) != (position > 0)):
+            raise ValueError("Invalid path {path!r} at position {position}.".format(path=path, position=position))
+        # end if
+        if match.group("name") is not None:
+            keys.append(_PATH_ALL if match.group("name") == "*" else match.group("name"))
+        elif match.group("index") is not None:
+            keys.append(int(match.group("index")))
+        elif match.group("all") is not None:
+            keys.append(_PATH_ALL)
+        else:
+            keys.append(_PATH_ESCAPE.sub(r"\1", match.group("key")))
+        # end if
+        position = match.end()
+    # end while
+    if not keys:
+        raise ValueError("Empty path.")
+    # end if
+    return keys
+# end def
+
+
+_PLAIN_DICTS = frozenset((dict, DictObject, FrozenDictObject))  # no hooks, so reading the dict directly is the same.
+_PLAIN_LISTS = frozenset((list, DictObjectList, FrozenDictObjectList))
+
+
+def _path_child(value, key):
+    """
+    Gets `value[key]`, or the value of the attribute `key` of a DictObject, for a path.
+
+    :return: The value, or _NOT_FOUND.
+    """
+    cls = type(value)
+    if cls in _PLAIN_DICTS:
+        child = dict.get(value, key, _NOT_FOUND)
+        if child is _NOT_FOUND and cls is not dict:
+            attribute_key = value._attribute_to_key_map.get(key, _NOT_FOUND)
+            if attribute_key is not _NOT_FOUND:
+                return dict.get(value, attribute_key, _NOT_FOUND)
+            # end if
+        # end if
+        return child
+    # end if
+    if cls in _PLAIN_LISTS and type(key) is int:
+        try:
+            return list.__getitem__(value, key)
+        except IndexError:
+            return _NOT_FOUND
+        # end try
+    # end if
+    if isinstance(value, Mapping):
+        try:
+            return value[key]
+        except (KeyError, TypeError):
+            pass
+        # end try
+        attribute_map = getattr(value, "_attribute_to_key_map", None) if isinstance(value, DictObject) else None
+        if attribute_map is not None and key in attribute_map:
+            return value.get(attribute_map[key], _NOT_FOUND)
+        # end if
+        if isinstance(value, (DictObjectRecord, ColumnarRow)) and isinstance(key, str):
+            return getattr(value, key, _NOT_FOUND)
+        # end if
+        return _NOT_FOUND
+    # end if
+    if isinstance(value, (list, tuple)) and isinstance(key, int):
+        try:
+            return value[key]
+        except IndexError:
+            return _NOT_FOUND
+        # end try
+    # end if
+    return _NOT_FOUND
+# end def
+
+
+def _path_children(value):
+    """
+    :return: All the values of a dict, or the elements of a list, for a `[*]` in a path.
+    """
+    cls = type(value)
+    if cls in _PLAIN_DICTS:
+        return dict.values(value)
+    # end if
+    if cls in _PLAIN_LISTS:
+        return value
+    # end if
+    if isinstance(value, Mapping):
+        return list(value.values())
+    # end if
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    # end if
+    return []
+# end def
+
+
+class DictObjectPath(object):
+    """
+    A parsed path into nested dicts and lists, see DictObject.compile_path().
+
+        >>> DictObject.compile_path("a[*].b")
+        DictObjectPath('a[*].b')
+    """
+    __slots__ = ("path", "_keys", "_wildcard")
+
+    def __init__(self, path):
+        self.path = path
+        self._keys = tuple(_parse_path(path))
+        self._wildcard = any(key is _PATH_ALL for key in self._keys)
+    # end def
+
+    def __repr__(self):
+        return "{cls}({path!r})".format(cls=type(self).__name__, path=self.path)
+    # end def
+
+    def _get(self, obj):
+        """
+        :return: The value, or _NOT_FOUND.
+        """
+        value = obj
+        for key in self._keys:
+            if type(value) in _PLAIN_DICTS:  # the most common case inline, else see _path_child()
+                child = dict.get(value, key, _NOT_FOUND)
+                if child is not _NOT_FOUND:
+                    value = child
+                    continue
+                # end if
+            # end if
+            value = _path_child(value, key)
+            if value is _NOT_FOUND:
+                return _NOT_FOUND
+            # end if
+        # end for
+        return value
+    # end def
+
+    def _get_all(self, obj):
+        """
+        :return: A list of all the values found.
+        """
+        values = [obj]
+        for key in self._keys:
+            if key is _PATH_ALL:
+                values = [child for value in values for child in _path_children(value)]
+            else:
+                values = [child for child in map(_path_child, values, itertools.repeat(key)) if child is not _NOT_FOUND]
+            # end if
+        # end for
+        return values
+    # end def
+
+    def get(self, obj, default=None):
+        """
+        Gets the value at the path.
+
+        :param obj: The DictObject (or any dict or list).
+        :param default: What you get if there is no value at the path. Default: None
+        :return: The value, or with a `[*]` in the path a list of all the values found.
+        """
+        if self._wildcard:
+            return self._get_all(obj)
+        # end if
+        value = self._get(obj)
+        return default if value is _NOT_FOUND else value
+    # end def
+
+    def __call__(self, obj, default=_NOT_FOUND):
+        """
+        Like get(), but without a default a KeyError if there is no value at the path.
+        """
+        if self._wildcard:
+            return self._get_all(obj)
+        # end if
+        value = self._get(obj)
+        if value is _NOT_FOUND:
+            if default is _NOT_FOUND:
+                raise KeyError(self.path)
+            # end if
+            return default
+        # end if
+        return value
+    # end def
+
+    def get_many(self, objs, default=None):
+        """
+        Gets the value at the path for each of the objects.
+
+        :param objs: The DictObjects (or any dicts or lists).
+        :param default: What you get for an object without a value at the path. Default: None
+        :return: A list with the value for each object.
+        """
+        if self._wildcard:
+            return [self._get_all(obj) for obj in objs]
+        # end if
+        get = self._get
+        return [default if value is _NOT_FOUND else value for value in map(get, objs)]
+    # end def
+# end class
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from collections.abc import MutableMapping  # python 3
+except ImportError:
+    from collections import MutableMapping  # py2
+# end try
+
+from luckydonaldUtils.encoding import to_native as n
+
+from . import DictObject, suppress_context, _BoundedCache
+
+__author__ = 'luckydonald'
+
+
+_record_types = _BoundedCache(maxsize=1000)  # (name, keys): class, see DictObject.record_type()
+
+
+def _unique_attribute_names(keys, reserved=None):
+    """
+    The attribute name of every key, numbered (`_1`, `_2`, ...) if two keys result in the same one, like DictObject does.
+
+    :param reserved: A class, its attribute names (methods) are numbered as well.
+    :return: dict of key: attribute name.
+    """
+    key_to_attribute = {}
+    used = set()
+    for key in keys:
+        attribute_name = base_name = DictObject.get_attribute_name_by_key(key)
+        i = 1
+        while attribute_name in used or (reserved is not None and hasattr(reserved, attribute_name)):
+            attribute_name = base_name + "_" + str(i)
+            i += 1
+        # end while
+        key_to_attribute[key] = attribute_name
+        used.add(attribute_name)
+    # end for
+    return key_to_attribute
+# end def
+
+
+def _create_record_type(keys, name):
+    key_to_attribute = _unique_attribute_names(keys, reserved=DictObjectRecord)
+    return type(n(name), (DictObjectRecord,), {
+        "__slots__": tuple(n(key_to_attribute[key]) for key in keys),
+        "_keys": keys,
+        "_key_to_attribute": key_to_attribute,
+    })
+# end def
+
+
+class DictObjectRecord(MutableMapping):
+    """
+    Base class of the record classes created by DictObject.record_type().
+    """
+    __slots__ = ()
+    _keys = ()
+    _key_to_attribute = {}
+
+    def __init__(self, data=(), **kwargs):
+        """
+        :param data: A dict (or iterable of key-value pairs) with the original keys.
+        :param kwargs: Values by attribute name.
+        """
+        key_to_attribute = self._key_to_attribute
+        objectify = DictObject.objectify
+        for key, value in (data.items() if isinstance(data, dict) else data):
+            try:
+                attribute_name = key_to_attribute[key]
+            except KeyError:
+                raise suppress_context(self._unknown_key(key))
+            # end try
+            setattr(self, attribute_name, objectify(value))
+        # end for
+        for attribute_name, value in kwargs.items():
+            setattr(self, attribute_name, objectify(value))
+        # end for
+    # end def
+
+    def _unknown_key(self, key):
+        return KeyError("{key!r} is not a key of {name}.".format(key=key, name=type(self).__name__))
+    # end def
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self._key_to_attribute[key])
+        except (KeyError, AttributeError):  # not a key of this type, or not set.
+            raise suppress_context(KeyError(key))
+        # end try
+    # end def
+
+    def __setitem__(self, key, value):
+        try:
+            attribute_name = self._key_to_attribute[key]
+        except KeyError:
+            raise suppress_context(self._unknown_key(key))
+        # end try
+        setattr(self, attribute_name, DictObject.objectify(value))
+    # end def
+
+    def __delitem__(self, key):
+        try:
+            delattr(self, self._key_to_attribute[key])
+        except (KeyError, AttributeError):
+            raise suppress_context(KeyError(key))
+        # end try
+    # end def
+
+    def __iter__(self):
+        for key in self._keys:
+            if hasattr(self, self._key_to_attribute[key]):
+                yield key
+            # end if
+        # end for
+    # end def
+
+    def __len__(self):
+        return sum(1 for _ in self)
+    # end def
+
+    def __repr__(self):
+        return "{name}({data!r})".format(name=type(self).__name__, data=dict(self.items()))
+    # end def
+
+    def to_dict_object(self):
+        """
+        :return: A DictObject with the same data. The values are not copied.
+        """
+        return DictObject(dict(self.items()))
+    # end def
+
+    def __reduce__(self):
+        # the class is created at runtime, so it can't be pickled by name.
+        return _unpickle_record, (self._keys, type(self).__name__, dict(self.items()))
+    # end def
+# end class
+
+
+def _unpickle_record(keys, name, data):
+    return DictObject.record_type(keys, name)(data)
+# end def
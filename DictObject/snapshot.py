@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+import bisect
+
+try:
+    from collections.abc import Mapping, Sequence  # python 3
+except ImportError:
+    from collections import Mapping, Sequence  # py2
+# end try
+
+from . import DictObject, DictObjectList, _NOT_FOUND, _snapshots
+from .frozen import FrozenDictObject, FrozenDictObjectList
+
+__author__ = 'luckydonald'
+
+
+class _SnapshotToken(object):
+    """
+    Shared by all the views of one snapshot. As long as one of them exists, the epoch is in `_snapshots.live`.
+    """
+    __slots__ = ("epoch", "__weakref__")
+
+    def __init__(self):
+        with _snapshots.lock:
+            self.epoch = _snapshots.epoch
+            _snapshots.live[self.epoch] = self  # before the next epoch starts, so changes in it save the content.
+            _snapshots.epoch += 1
+        # end with
+    # end def
+# end class
+
+
+def _snapshot_entry(node, epoch):
+    """
+    :return: The saved content of node for a snapshot of that epoch, or _NOT_FOUND if it didn't change since then.
+    """
+    history = getattr(node, "_cow_history", None)  # plain dicts and lists (in lazy containers) never change.
+    if history:
+        i = bisect.bisect_left(history, (epoch,))
+        if i < len(history):
+            return history[i][1]
+        # end if
+    # end if
+    return _NOT_FOUND
+# end def
+
+
+def _snapshot_item(node, key, epoch):
+    """
+    :return: `node[key]` as seen by a snapshot of that epoch, or _NOT_FOUND.
+    """
+    # First the live value, then the history: a change saves the content before changing it,
+    # so if the value read was changed already, the saved content is there as well.
+    if isinstance(node, dict):
+        value = dict.get(node, key, _NOT_FOUND)
+        content = _snapshot_entry(node, epoch)
+        return value if content is _NOT_FOUND else content.get(key, _NOT_FOUND)
+    # end if
+    try:
+        value = list.__getitem__(node, key)
+    except IndexError:
+        value = _NOT_FOUND
+    # end try
+    content = _snapshot_entry(node, epoch)
+    if content is not _NOT_FOUND:
+        try:
+            value = content[key]
+        except IndexError:
+            value = _NOT_FOUND
+        # end try
+    # end if
+    return value
+# end def
+
+
+def _snapshot_content(node, epoch):
+    """
+    :return: The content of node as seen by a snapshot of that epoch, a plain dict, list or set.
+    """
+    if isinstance(node, dict):
+        live = dict.copy(node)
+    elif isinstance(node, list):
+        live = list.__getitem__(node, slice(None))
+    else:
+        live = set.copy(node)
+    # end if
+    content = _snapshot_entry(node, epoch)
+    return live if content is _NOT_FOUND else content
+# end def
+
+
+def _snapshot_value(value, token):
+    """
+    :return: The value for a snapshot, with the dicts, lists and sets in it as read-only views (or copies).
+    """
+    if isinstance(value, dict):
+        return value if isinstance(value, FrozenDictObject) else DictObjectSnapshot(value, token)
+    elif isinstance(value, list):
+        return value if isinstance(value, FrozenDictObjectList) else DictObjectListSnapshot(value, token)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(_snapshot_content(value, token.epoch)) if isinstance(value, set) else value
+    elif isinstance(value, tuple):
+        return tuple(_snapshot_value(x, token) for x in value)
+    # end if
+    return value
+# end def
+
+
+def _snapshot_copy(value):
+    """
+    :return: A changeable copy of a value of a snapshot, see DictObjectSnapshot.to_dict_object().
+    """
+    if isinstance(value, DictObjectSnapshot):
+        return DictObject({key: _snapshot_copy(x) for key, x in value.items()})
+    elif isinstance(value, DictObjectListSnapshot):
+        return DictObjectList([_snapshot_copy(x) for x in value])
+    elif isinstance(value, tuple):
+        return tuple(_snapshot_copy(x) for x in value)
+    # end if
+    return value
+# end def
+
+
+class DictObjectSnapshot(Mapping):
+    """
+    A read-only view of a DictObject at the time DictObject.snapshot() was called.
+    It works like a dict and has the attributes of a DictObject, nested dicts and lists are views as well.
+    """
+    __slots__ = ("_node", "_token")
+
+    def __init__(self, node, token):
+        object.__setattr__(self, "_node", node)
+        object.__setattr__(self, "_token", token)
+    # end def
+
+    def __setattr__(self, name, value):
+        raise TypeError("A snapshot is read-only.")
+    # end def
+
+    __delattr__ = __setattr__
+
+    def __getitem__(self, key):
+        value = _snapshot_item(self._node, key, self._token.epoch)
+        if value is _NOT_FOUND:
+            raise KeyError(key)
+        # end if
+        return _snapshot_value(value, self._token)
+    # end def
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        # end if
+        node = self._node
+        epoch = self._token.epoch
+        value = _snapshot_item(node, name, epoch)
+        if value is _NOT_FOUND:  # an attribute name for a different key, e.g. `user_name` for "user-name".
+            key = node._attribute_to_key_map.get(name, _NOT_FOUND)
+            if key is not _NOT_FOUND:
+                value = _snapshot_item(node, key, epoch)
+            # end if
+        # end if
+        if value is _NOT_FOUND and _snapshot_entry(node, epoch) is not _NOT_FOUND:
+            # The attribute map is the live one, the key may have been deleted since the snapshot.
+            for key, key_value in _snapshot_entry(node, epoch).items():
+                if DictObject.get_attribute_name_by_key(key) == name:
+                    value = key_value
+                    break
+                # end if
+            # end for
+        # end if
+        if value is _NOT_FOUND:
+            raise AttributeError(name)
+        # end if
+        return _snapshot_value(value, self._token)
+    # end def
+
+    def __contains__(self, key):
+        return _snapshot_item(self._node, key, self._token.epoch) is not _NOT_FOUND
+    # end def
+
+    def __iter__(self):
+        node = self._node
+        keys = list(dict.keys(node))  # the live ones first, see _snapshot_item().
+        content = _snapshot_entry(node, self._token.epoch)
+        return iter(keys if content is _NOT_FOUND else content)
+    # end def
+
+    def __len__(self):
+        node = self._node
+        length = dict.__len__(node)
+        content = _snapshot_entry(node, self._token.epoch)
+        return length if content is _NOT_FOUND else len(content)
+    # end def
+
+    def __repr__(self):
+        return repr(self.to_dict_object())
+    # end def
+
+    def to_dict_object(self):
+        """
+        :return: A changeable DictObject with the data of this snapshot.
+        """
+        return _snapshot_copy(self)
+    # end def
+# end class
+
+
+class DictObjectListSnapshot(Sequence):
+    """
+    A read-only view of a DictObjectList at the time DictObjectList.snapshot() was called.
+    See DictObjectSnapshot.
+    """
+    __slots__ = ("_node", "_token")
+
+    __init__ = DictObjectSnapshot.__dict__["__init__"]
+    __setattr__ = __delattr__ = DictObjectSnapshot.__dict__["__setattr__"]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_snapshot_value(x, self._token) for x in _snapshot_content(self._node, self._token.epoch)[index]]
+        # end if
+        value = _snapshot_item(self._node, index, self._token.epoch)
+        if value is _NOT_FOUND:
+            raise IndexError("list index out of range")
+        # end if
+        return _snapshot_value(value, self._token)
+    # end def
+
+    def __iter__(self):
+        for value in _snapshot_content(self._node, self._token.epoch):
+            yield _snapshot_value(value, self._token)
+        # end for
+    # end def
+
+    def __len__(self):
+        return len(_snapshot_content(self._node, self._token.epoch))
+    # end def
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, DictObjectListSnapshot)):
+            return NotImplemented
+        # end if
+        return list(self) == list(other)
+    # end def
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+    # end def
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_dict_object())
+    # end def
+
+    def to_dict_object(self):
+        """
+        :return: A changeable DictObjectList with the data of this snapshot.
+        """
+        return _snapshot_copy(self)
+    # end def
+# end class
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+import re
+import json
+import codecs
+
+from luckydonaldUtils import encoding
+
+from . import DictObject, DictObjectList, _NOT_FOUND
+
+__author__ = 'luckydonald'
+
+
+_INCLUDE, _WALK, _SKIP = "include", "walk", "skip"
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON_TOKEN = re.compile(r'[^,:\]}\s]*')  # a number, true, false or null
+
+
+class _StreamingJSONLoader(object):
+    """
+    Parses a json document from a file, reading it in chunks. See DictObject.load().
+
+    Values fitting into the buffer are decoded at once by json's (C) raw_decode().
+    Bigger objects and arrays are walked key by key (item by item), so the buffer never needs to hold them completely.
+    With `include` only the matching subtrees are built, everything else is skipped.
+    """
+    def __init__(self, file, include=None, chunk_size=65536):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = u""
+        self.pos = 0
+        self.offset = 0  # position of the buffer start in the file, for error messages.
+        self.eof = False
+        self.bytes_decoder = None
+        # json.loads() uses the same string object for equal keys, but only within one raw_decode() call.
+        self.keys = {}
+        self.decoder = json.JSONDecoder(object_hook=self.object_hook)
+        self.skip_decoder = json.JSONDecoder()
+        if include is None:
+            self.patterns = None
+        else:
+            self.patterns = [
+                tuple(pattern) if isinstance(pattern, (list, tuple)) else tuple(pattern.split("."))
+                for pattern in include
+            ]
+        # end if
+    # end def
+
+    def object_hook(self, d):
+        keys = self.keys
+        return DictObject({keys.setdefault(key, key): value for key, value in d.items()})
+    # end def
+
+    def load(self):
+        value = self.value((), _INCLUDE if self.patterns is None else _WALK)
+        if self.skip_whitespace():
+            self.error("Extra data")
+        # end if
+        return value
+    # end def
+
+    def error(self, message):
+        raise ValueError("{message}: char {pos}".format(message=message, pos=self.offset + self.pos))
+    # end def
+
+    def fill(self):
+        """
+        Reads the next chunk into the buffer, dropping the already parsed part.
+
+        :return: False at the end of the file.
+        """
+        if self.eof:
+            return False
+        # end if
+        chunk = self.file.read(self.chunk_size)
+        if isinstance(chunk, encoding.binary_type) and not isinstance(chunk, encoding.unicode_type):
+            if self.bytes_decoder is None:
+                self.bytes_decoder = codecs.getincrementaldecoder("utf-8")()
+            # end if
+            chunk = self.bytes_decoder.decode(chunk, final=not chunk)
+        # end if
+        if not chunk:
+            self.eof = True
+            return False
+        # end if
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+    # end def
+
+    def skip_whitespace(self):
+        """
+        :return: The next not whitespace character, or an empty string at the end of the file.
+        """
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            # end if
+            if not self.fill():
+                return u""
+            # end if
+        # end while
+    # end def
+
+    def child_mode(self, path):
+        """
+        If the value at the given path should be included completely, walked to find included values, or skipped.
+        """
+        mode = _SKIP
+        for pattern in self.patterns:
+            if len(pattern) > len(path) and mode == _WALK:
+                continue
+            # end if
+            for wanted, actual in zip(pattern, path):
+                if wanted != "*" and wanted != actual:
+                    break
+                # end if
+            else:
+                if len(pattern) <= len(path):
+                    return _INCLUDE
+                # end if
+                mode = _WALK
+            # end for
+        # end for
+        return mode
+    # end def
+
+    def decode(self, mode):
+        """
+        Decodes the next object or array with raw_decode(), if it is in the buffer completely.
+
+        :return: The value, or _NOT_FOUND if it is not in the buffer completely.
+        """
+        decoder = self.skip_decoder if mode == _SKIP else self.decoder
+        refilled = False
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                # Probably cut off by the end of the buffer. Read more once, if that isn't too much.
+                if refilled or len(self.buffer) - self.pos >= self.chunk_size or not self.fill():
+                    return _NOT_FOUND
+                # end if
+                refilled = True
+                continue
+            # end try
+            self.pos = end
+            if mode == _SKIP:
+                return None
+            # end if
+            return value if isinstance(value, DictObject) else DictObject.objectify(value)
+        # end while
+    # end def
+
+    def value(self, path, mode):
+        char = self.skip_whitespace()
+        if char == u"{":
+            if mode != _WALK:
+                value = self.decode(mode)
+                if value is not _NOT_FOUND:
+                    return value
+                # end if
+            # end if
+            return self.object(path, mode)
+        elif char == u"[":
+            if mode != _WALK:
+                value = self.decode(mode)
+                if value is not _NOT_FOUND:
+                    return value
+                # end if
+            # end if
+            return self.array(path, mode)
+        elif not char:
+            self.error("Expecting value")
+        # end if
+        return self.scalar()
+    # end def
+
+    def scalar(self):
+        if self.buffer[self.pos] != u'"':
+            # make sure a number (or true, ...) isn't cut off by the end of the buffer.
+            while _JSON_TOKEN.match(self.buffer, self.pos).end() == len(self.buffer) and self.fill():
+                pass
+            # end while
+        # end if
+        while True:
+            try:
+                value, end = self.skip_decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self.fill():
+                    self.error("Expecting value")
+                # end if
+                continue  # a long string, continuing in the next chunk.
+            # end try
+            self.pos = end
+            return value
+        # end while
+    # end def
+
+    def object(self, path, mode):
+        self.pos += 1  # {
+        items = {}
+        char = self.skip_whitespace()
+        if char == u"}":
+            self.pos += 1
+            return DictObject() if mode != _SKIP else None
+        # end if
+        while True:
+            if char != u'"':
+                self.error("Expecting property name enclosed in double quotes")
+            # end if
+            key = self.scalar()
+            key = self.keys.setdefault(key, key)
+            if self.skip_whitespace() != u":":
+                self.error("Expecting ':' delimiter")
+            # end if
+            self.pos += 1
+            if mode == _WALK:
+                child_path = path + (key,)
+                child_mode = self.child_mode(child_path)
+            else:
+                child_path, child_mode = path, mode
+            # end if
+            value = self.value(child_path, child_mode)
+            if child_mode != _SKIP:
+                items[key] = value
+            # end if
+            char = self.skip_whitespace()
+            self.pos += 1
+            if char == u"}":
+                break
+            elif char != u",":
+                self.pos -= 1
+                self.error("Expecting ',' delimiter")
+            # end if
+            char = self.skip_whitespace()
+        # end while
+        return DictObject(items) if mode != _SKIP else None
+    # end def
+
+    def array(self, path, mode):
+        self.pos += 1  # [
+        items = []
+        char = self.skip_whitespace()
+        if char == u"]":
+            self.pos += 1
+            return DictObjectList([]) if mode != _SKIP else None
+        # end if
+        index = 0
+        while True:
+            if mode == _WALK:
+                child_path = path + (str(index),)
+                child_mode = self.child_mode(child_path)
+            else:
+                child_path, child_mode = path, mode
+            # end if
+            value = self.value(child_path, child_mode)
+            if child_mode != _SKIP:
+                items.append(value)
+            # end if
+            index += 1
+            char = self.skip_whitespace()
+            self.pos += 1
+            if char == u"]":
+                break
+            elif char != u",":
+                self.pos -= 1
+                self.error("Expecting ',' delimiter")
+            # end if
+        # end while
+        return DictObjectList(items) if mode != _SKIP else None
+    # end def
+# end class
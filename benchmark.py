@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+Small benchmarks for the hot paths of DictObject.
+Just run `benchmark.py`, or `benchmark.py <name> [<name> ...]` to only run some of them.
+"""
+import sys
+import copy
+import timeit
+
+from DictObject import DictObject, DictObjectList, SelfObjectifyMixin
+from luckydonaldUtils.encoding import to_native as n
+
+__author__ = 'luckydonald'
+
+
+def _time(stmt, number, repeat=5):
+    """ Best time of `repeat` runs, per call, in microseconds. """
+    return min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1000000
+# end def
+
+
+def _report(name, old, new):
+    print("{name:<45} {old:>12.2f}us {new:>12.2f}us {speedup:>8.2f}x".format(
+        name=name, old=old, new=new, speedup=old / new
+    ))
+# end def
+
+
+class BaselineDictObject(DictObject):
+    """
+    The constructor, __getattr__ and __setattr__ of DictObject 1.1.0,
+    which copied every key twice and objectified every value twice,
+    and needed two exceptions for every attribute read.
+    """
+    def __init__(self, *args, **kwargs):
+        if len(args) == 1:
+            dict.__init__(self, *args, **kwargs)
+        else:
+            dict.__init__(self, **kwargs)
+        # end if
+        self._attribute_to_key_map = {}
+        kwargs_dict = dict(**kwargs)
+        for arg in args:
+            self.merge_dict(arg)
+        self.merge_dict(kwargs_dict)
+    # end def
+
+    def merge_dict(self, d):
+        for a, b in d.items():
+            attribute_name = self.get_attribute_name_by_key(a)
+            self._add_to_object_part(a, b)
+            self._attribute_to_key_map[n(attribute_name)] = a
+        return self
+    # end def
+
+    def __getattr__(self, name):
+        _exception = None  # py2
+        try:
+            value = dict.__getattribute__(self, n(name))
+            return value
+        except AttributeError:
+            try:
+                if n(name) in self.__dict__:
+                    return self.__dict__[n(name)]
+                if self._attribute_to_key_map:
+                    key_name = self._attribute_to_key_map[n(name)]
+                    self.on_get(key_name)
+                    value = dict.__getitem__(self, key_name)
+                    value = self.after_get(key_name, value)
+                    return value
+                else:
+                    _exception = AttributeError(name)
+                    _exception.__cause__ = None
+            except KeyError:
+                _exception = AttributeError(name)
+                _exception.__cause__ = None
+            finally:
+                if _exception:
+                    raise _exception
+        finally:
+            if _exception:
+                raise _exception
+    # end def
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            dict.__setattr__(self, name, value)
+            return
+        else:
+            key_name = self._attribute_to_key_map[n(name)] if n(name) in self._attribute_to_key_map else name
+        value = self.on_set(name, value)
+        self._add_to_object_part(name, value)
+        self._attribute_to_key_map[n(name)] = key_name
+        dict.__setitem__(self, self._attribute_to_key_map[n(name)], DictObject.objectify(value))
+        self.after_set(name, value)
+    # end def
+# end class
+
+
+def bench_constructor():
+    """ `DictObject(big_dict)` and attribute assignment, compared with the 1.1.0 implementation. """
+    big_dict = {"key {i}".format(i=i): "value {i}".format(i=i) for i in range(10000)}
+    _report(
+        "DictObject(big_dict), 10000 keys",
+        _time(lambda: BaselineDictObject(big_dict), number=20),
+        _time(lambda: DictObject(big_dict), number=20),
+    )
+    old, new = BaselineDictObject(big_dict), DictObject(big_dict)
+
+    def assign(obj):
+        obj.some_value = 1234
+    # end def
+    _report("obj.some_value = 1234", _time(lambda: assign(old), number=100000), _time(lambda: assign(new), number=100000))
+
+    def assign_dict(obj):
+        obj.some_value = {"a": 1, "b": [1, 2, 3]}
+    # end def
+    _report(
+        "obj.some_value = {'a': 1, 'b': [1, 2, 3]}",
+        _time(lambda: assign_dict(old), number=20000),
+        _time(lambda: assign_dict(new), number=20000),
+    )
+# end def
+
+
+def bench_attribute_names():
+    """ DictObject.get_attribute_name_by_key() for repeated keys, compared with the uncached translation. """
+    from DictObject import attribute_name_cache
+    keys = ["some-key {i}".format(i=i % 300) for i in range(10000)]
+
+    def translate_all():
+        get_attribute_name_by_key = DictObject.get_attribute_name_by_key
+        for key in keys:
+            get_attribute_name_by_key(key)
+        # end for
+    # end def
+
+    maxsize = attribute_name_cache.maxsize
+    attribute_name_cache.maxsize = 0
+    attribute_name_cache.clear()
+    old = _time(translate_all, number=20)
+    attribute_name_cache.maxsize = maxsize
+    new = _time(translate_all, number=20)
+    _report("10000 keys, 300 distinct", old, new)
+# end def
+
+
+def _traced_size(build):
+    """ Bytes allocated by `build()`, which are still in use (by it's result). """
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+# end def
+
+
+def bench_memory(count=100000):
+    """ Memory of a DictObjectList of uniform records, with and without shared attribute maps. """
+    from DictObject import DictObjectList, shared_attribute_maps
+    records = [
+        {"id": i, "user-name": "user", "e-mail": "mail", "active": True, "score": 1.5, "tags": None}
+        for i in range(count)
+    ]
+    maxsize = shared_attribute_maps.maxsize
+    shared_attribute_maps.maxsize = 0
+    shared_attribute_maps.clear()
+    old = _traced_size(lambda: DictObjectList(records))
+    shared_attribute_maps.maxsize = maxsize
+    new = _traced_size(lambda: DictObjectList(records))
+    print("{name:<45} {old:>12.1f}MB {new:>12.1f}MB {speedup:>8.2f}x".format(
+        name="{count} records, 6 keys each".format(count=count), old=old / 1e6, new=new / 1e6, speedup=old / new,
+    ))
+# end def
+
+
+def _traced_peak(build, run):
+    """
+    Bytes in use at most while `run(built)` runs, and afterwards, both with the result of `build()` still referenced.
+    Needs python 3.9+ (tracemalloc.reset_peak()).
+    """
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    built = build()
+    tracemalloc.reset_peak()
+    result = run(built)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result, built
+    return peak, size
+# end def
+
+
+def bench_normalify(count=20000):
+    """ Memory of DictObject.normalify(), copying and with inplace=True. Counts the original, which inplace frees. """
+    from DictObject import LazyDictObject
+
+    def document():
+        return {"items": [
+            {"id": i, "name": "user {i}".format(i=i), "tags": ["a", "b"], "meta": {"x": i, "y": [i]}}
+            for i in range(count)
+        ]}
+    # end def
+
+    for name, build in (("DictObject", lambda: DictObject.objectify(document())), ("LazyDictObject", lambda: LazyDictObject(document()))):
+        old_peak, old_size = _traced_peak(build, lambda obj: DictObject.normalify(obj))
+        new_peak, new_size = _traced_peak(build, lambda obj: DictObject.normalify(obj, inplace=True))
+        for what, old, new in (("peak", old_peak, new_peak), ("afterwards", old_size, new_size)):
+            print("{name:<45} {old:>12.1f}MB {new:>12.1f}MB {speedup:>8.2f}x".format(
+                name="{name} of {count} records, {what}".format(name=name, count=count, what=what),
+                old=old / 1e6, new=new / 1e6, speedup=old / new,
+            ))
+        # end for
+    # end for
+# end def
+
+
+def bench_records(count=1000000):
+    """ DictObject.record_type() records compared with DictObjects, for uniform rows. """
+    rows = [
+        {"id": i, "user-name": "user", "e-mail": "mail", "active": True, "score": 1.5, "tags": None}
+        for i in range(count)
+    ]
+    Row = DictObject.record_type(rows[0])
+    old = _traced_size(lambda: [DictObject(row) for row in rows])
+    new = _traced_size(lambda: [Row(row) for row in rows])
+    print("{name:<45} {old:>12.1f}MB {new:>12.1f}MB {speedup:>8.2f}x".format(
+        name="{count} rows, 6 keys each".format(count=count), old=old / 1e6, new=new / 1e6, speedup=old / new,
+    ))
+    obj, record = DictObject(rows[0]), Row(rows[0])
+    _report("obj.user_name", _time(lambda: obj.user_name, number=200000), _time(lambda: record.user_name, number=200000))
+    _report("obj['user-name']", _time(lambda: obj["user-name"], number=200000), _time(lambda: record["user-name"], number=200000))
+    _report("creating a row", _time(lambda: DictObject(rows[0]), number=100000), _time(lambda: Row(rows[0]), number=100000))
+# end def
+
+
+def bench_columnar(count=500000):
+    """ ColumnarDictObjectList compared with a DictObjectList of uniform records. """
+    from DictObject import DictObjectList
+    rows = [{"id": i, "name": "item", "price": i * 0.25, "stock": i % 100} for i in range(count)]
+    old = _traced_size(lambda: DictObjectList.from_records(rows))
+    new = _traced_size(lambda: DictObjectList.from_records(rows, columnar=True))
+    print("{name:<45} {old:>12.1f}MB {new:>12.1f}MB {speedup:>8.2f}x".format(
+        name="{count} rows, 4 keys each".format(count=count), old=old / 1e6, new=new / 1e6, speedup=old / new,
+    ))
+    objects, table = DictObjectList.from_records(rows), DictObjectList.from_records(rows, columnar=True)
+    _report("sum of a column", _time(lambda: sum(row.price for row in objects), number=3), _time(lambda: table.sum("price"), number=3))
+    _report(
+        "filter on a column",
+        _time(lambda: [row for row in objects if row.stock < 10], number=3),
+        _time(lambda: table.filter("stock", lambda stock: stock < 10), number=3),
+    )
+# end def
+
+
+def bench_getattr():
+    """ Reading a value with `obj.key`, compared with 1.1.0, and `dict.__getitem__` for reference. """
+    data = {"key": "value", "other-key": 2}
+    old, new, plain = BaselineDictObject(data), DictObject(data), dict(data)
+    _report("obj.key", _time(lambda: old.key, number=200000), _time(lambda: new.key, number=200000))
+    _report("obj.other_key", _time(lambda: old.other_key, number=200000), _time(lambda: new.other_key, number=200000))
+    getitem = dict.__getitem__
+    _report(
+        "reference: plain_dict['key'] vs obj.key",
+        _time(lambda: plain["key"], number=200000),
+        _time(lambda: new.key, number=200000),
+    )
+    _report(
+        "reference: dict.__getitem__(obj, 'key') vs obj.key",
+        _time(lambda: getitem(new, "key"), number=200000),
+        _time(lambda: new.key, number=200000),
+    )
+    _report(
+        "missing: hasattr(obj, 'nope')",
+        _time(lambda: hasattr(old, "nope"), number=200000),
+        _time(lambda: hasattr(new, "nope"), number=200000),
+    )
+# end def
+
+
+def bench_paths(count=100000):
+    """ Reading a nested value with a compiled path, compared with chained `__getattr__` and `try/except`. """
+    objs = DictObjectList([
+        {"data": {"entries": [{"attrs": {"name": str(i)}}, {"attrs": {}}]}} for i in range(count)
+    ])
+
+    def chained(path_index):
+        result = []
+        for obj in objs:
+            try:
+                result.append(obj.data.entries[path_index].attrs.name)
+            except (AttributeError, IndexError):
+                result.append(None)
+            # end try
+        # end for
+        return result
+    # end def
+
+    name, missing = DictObject.compile_path("data.entries[0].attrs.name"), DictObject.compile_path("data.entries[1].attrs.name")
+    assert chained(0) == name.get_many(objs) and chained(1) == missing.get_many(objs)
+    _report("obj.data.entries[0].attrs.name", _time(lambda: chained(0), number=3), _time(lambda: name.get_many(objs), number=3))
+    _report("missing, with try/except", _time(lambda: chained(1), number=3), _time(lambda: missing.get_many(objs), number=3))
+    wildcard = DictObject.compile_path("data.entries[*].attrs.name")
+    _report(
+        "data.entries[*].attrs.name",
+        _time(lambda: [[x.attrs.name for x in obj.data.entries if "name" in x.attrs] for obj in objs], number=3),
+        _time(lambda: wildcard.get_many(objs), number=3),
+    )
+# end def
+
+
+def bench_copy(count=2000):
+    """ copy.deepcopy() and copy.copy(), compared with the generic __reduce_ex__() way used before. """
+    obj = DictObject({"users": [
+        {"id": i, "user-name": "user {i}".format(i=i), "tags": ["a", "b"], "stats": {"luck": i % 10, "level": 1.5}}
+        for i in range(count)
+    ]})
+
+    def generic(function):
+        # without __copy__ and __deepcopy__, copy falls back to __reduce_ex__() and __setstate__().
+        methods = [
+            (cls, name, cls.__dict__[name]) for cls in (DictObject, SelfObjectifyMixin) for name in ("__copy__", "__deepcopy__")
+        ]
+        for cls, name, method in methods:
+            delattr(cls, name)
+        # end for
+        try:
+            return function(obj)
+        finally:
+            for cls, name, method in methods:
+                setattr(cls, name, method)
+            # end for
+        # end try
+    # end def
+
+    assert generic(copy.deepcopy) == copy.deepcopy(obj)
+    _report("copy.deepcopy(obj)", _time(lambda: generic(copy.deepcopy), number=3), _time(lambda: copy.deepcopy(obj), number=3))
+    users = obj.users
+    _report(
+        "copy.copy(list)",
+        _time(lambda: generic(lambda _: copy.copy(users)), number=200),
+        _time(lambda: copy.copy(users), number=200),
+    )
+# end def
+
+
+def bench_hooks():
+    """ Get, set and delete on a DictObject, when all hooks are called (like 1.1.0 did) and when they are skipped. """
+    import types
+
+    def copy_function(func):
+        return types.FunctionType(func.__code__, func.__globals__, func.__name__, func.__defaults__, func.__closure__)
+    # end def
+
+    class HookedDictObject(DictObject):
+        """ Overrides every hook with (a copy of) the default implementation, so they all get called. """
+        on_get, on_set, on_del = copy_function(DictObject.on_get), copy_function(DictObject.on_set), copy_function(DictObject.on_del)
+        after_get, after_set = copy_function(DictObject.after_get), copy_function(DictObject.after_set)
+        after_del = copy_function(DictObject.after_del)
+    # end class
+
+    old, new = HookedDictObject(key="value"), DictObject(key="value")
+
+    def setattr_(obj):
+        obj.key = "value"
+    # end def
+
+    def setitem_(obj):
+        obj["key"] = "value"
+    # end def
+
+    def delitem_(obj):
+        obj["other"] = 1
+        del obj["other"]
+    # end def
+
+    _report("obj.key", _time(lambda: old.key, number=200000), _time(lambda: new.key, number=200000))
+    _report("obj.key = 'value'", _time(lambda: setattr_(old), number=200000), _time(lambda: setattr_(new), number=200000))
+    _report("obj['key'] = 'value'", _time(lambda: setitem_(old), number=200000), _time(lambda: setitem_(new), number=200000))
+    _report("obj['other'] = 1; del obj['other']", _time(lambda: delitem_(old), number=100000), _time(lambda: delitem_(new), number=100000))
+# end def
+
+
+def bench_json():
+    """ Serializing 10000 records, like AutosaveDictObject writes them. """
+    import json
+    from DictObject.autosave import AutosaveDictObject
+
+    obj = DictObject({"users": [
+        {"id": i, "name": "user {i}".format(i=i), "tags": ["a", "b"], "info": {"x": i * 1.5, "y": None}}
+        for i in range(10000)
+    ]})
+
+    def autosave_before():
+        return json.dumps(obj, sort_keys=True, indent=4, separators=(',', ': '), default=AutosaveDictObject._parse_object)
+    # end def
+
+    def normalify_before():
+        return json.dumps(DictObject.normalify(obj))
+    # end def
+
+    _report("autosave json (indent=4, sort_keys)", _time(autosave_before, number=3), _time(obj.to_json, number=3))
+    _report("json.dumps(normalify(obj))", _time(normalify_before, number=3), _time(obj.to_json, number=3))
+# end def
+
+
+def main(names=None):
+    benchmarks = [(name, func) for name, func in sorted(globals().items()) if name.startswith("bench_")]
+    print("{name:<45} {old:>14} {new:>14} {speedup:>9}".format(name="benchmark", old="before", new="after", speedup="speedup"))
+    for name, func in benchmarks:
+        if names and name[len("bench_"):] not in names:
+            continue
+        # end if
+        print("# " + name[len("bench_"):] + ": " + func.__doc__.strip())
+        func()
+    # end for
+# end def
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
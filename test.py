@@ -3,13 +3,36 @@ import sys
 __author__ = 'luckydonald'
 
 def test():
+    import os
+    import shutil
+    import tempfile
     import DictObject
+    import DictObject.frozen
+    import DictObject.index
+    import DictObject.records
+    import DictObject.columnar
+    import DictObject.snapshot
+    import DictObject.path
+    import DictObject.streaming
     import DictObject.autosave
     DictObject.______do_more_doctests______()  # for coverage report.
     import doctest
-    returned = []
-    returned.append(doctest.testmod(DictObject, verbose=True))
-    returned.append(doctest.testmod(DictObject.autosave, verbose=True))
+    # The doctests of DictObject.autosave write files, so they run in a temporary folder.
+    cwd = os.getcwd()
+    folder = tempfile.mkdtemp(prefix="DictObject-test-")
+    os.chdir(folder)
+    try:
+        returned = []
+        for module in (
+            DictObject, DictObject.frozen, DictObject.index, DictObject.records, DictObject.columnar,
+            DictObject.snapshot, DictObject.path, DictObject.streaming, DictObject.autosave,
+        ):
+            returned.append(doctest.testmod(module, verbose=True))
+        # end for
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(folder, ignore_errors=True)
+    # end try
     return all(returned)
 
 